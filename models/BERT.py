@@ -3,6 +3,7 @@ import re
 import os
 import torch
 from transformers import CamembertTokenizer, CamembertForSequenceClassification
+from transcript_format import TranscriptReader
 
 tokenizer = CamembertTokenizer.from_pretrained("./camembert_custom_model")
 model = CamembertForSequenceClassification.from_pretrained("./camembert_custom_model")
@@ -31,6 +32,15 @@ def load_transcript(file_path):
 
     - file_path : le chemin d'accès au fichier
     """
+    # Transcript structuré s'il existe : seules les colonnes utiles (timings et texte) sont lues
+    if TranscriptReader.exists(file_path):
+        reader = TranscriptReader(file_path)
+        return [
+            {"timecode": timecode, "text": text}
+            for timecode, text in zip(reader.timecodes(), reader.texts("text"))
+        ]
+
+    # Ancien format texte
     transcript = []
     try:
         with open(file_path, "r", encoding="utf-8") as file:
@@ -0,0 +1,246 @@
+import numpy as np
+from scipy.fft import rfft, rfftfreq
+from scipy.signal import get_window
+from quality_plots import minmax_envelope
+
+NORMALIZE_HEADROOM_DB = 6.0
+INT16_MAX = 32767
+SATURATION_RATIO = 0.95   # un échantillon est saturé s'il dépasse 95 % du pic
+ROLLOFF_RATIO = 0.85
+
+# spectre moyen (Welch) : trames de Hann de 100 ms recouvertes de moitié, même résolution (10 Hz)
+# quelle que soit la fréquence d'échantillonnage ; estimateur partagé par toutes les analyses
+SPECTRUM_FRAME_SEC = 0.1
+SPECTRUM_FRAMES_PER_CHUNK = 256
+SATURATION_BINS = 20000
+ENVELOPE_POINTS_PER_BLOCK = 64
+
+def spectrum_nperseg(sr, frame_sec=SPECTRUM_FRAME_SEC):
+    return max(int(round(sr * frame_sec)), 2)
+
+def spectrum_frames(samples, nperseg):
+    """
+    Trames de nperseg échantillons, recouvertes de moitié, sur le dernier axe : (..., F, nperseg), sans copie.
+    Un signal plus court qu'une trame donne F = 0.
+    """
+    if samples.shape[-1] < nperseg:
+        return np.zeros(samples.shape[:-1] + (0, nperseg), dtype=samples.dtype)
+    return np.lib.stride_tricks.sliding_window_view(samples, nperseg, axis=-1)[..., ::nperseg // 2, :]
+
+def frames_power(frames, weights=None, chunk=SPECTRUM_FRAMES_PER_CHUNK):
+    """
+    Somme des spectres de puissance des trames (avant-dernier axe), trame centrée et fenêtrée (Hann).
+    Calculée par paquets de `chunk` trames : la mémoire ne dépend pas de la durée du signal.
+
+    - frames : (..., F, nperseg)
+    - weights : poids de chaque trame (..., F), par exemple 0 pour les trames de remplissage
+    Retourne un tableau (..., nperseg // 2 + 1).
+    """
+    nperseg = frames.shape[-1]
+    window = get_window("hann", nperseg).astype(np.float32)
+    total = np.zeros(frames.shape[:-2] + (nperseg // 2 + 1,), dtype=np.float64)
+    for start in range(0, frames.shape[-2], chunk):
+        part = frames[..., start:start + chunk, :]
+        part = (part - part.mean(axis=-1, keepdims=True)) * window
+        power = np.square(np.abs(rfft(part, axis=-1)))
+        if weights is not None:
+            power *= weights[..., start:start + chunk, np.newaxis]
+        total += power.sum(axis=-2)
+    return total
+
+def mean_spectrum(power_sum, n_frames, nperseg, sr):
+    """
+    Spectre de magnitude moyen : racine de la puissance moyenne par trame (même allure que |rfft| du signal entier).
+    Retourne (fréquences, magnitudes) ; n_frames peut être un tableau (une valeur par signal).
+    """
+    n_frames = np.asarray(n_frames)
+    scale = np.where(n_frames > 0, 1 / np.maximum(n_frames, 1), 0)
+    return rfftfreq(nperseg, 1 / sr), np.sqrt(power_sum * scale[..., np.newaxis]) / nperseg
+
+def welch_spectrum(samples, sr, frame_sec=SPECTRUM_FRAME_SEC):
+    """
+    Spectre moyen d'un signal entier, identique à celui de StreamingQualityAccumulator pour le même signal
+    (même découpage en trames depuis le premier échantillon, trame incomplète de fin ignorée).
+    Un signal plus court qu'une trame est complété par des zéros.
+    """
+    nperseg = spectrum_nperseg(sr, frame_sec)
+    frames = spectrum_frames(samples, nperseg)
+    if frames.shape[-2] == 0 and len(samples) > 0:
+        frames = np.zeros((1, nperseg), dtype=np.float32)
+        frames[0, :len(samples)] = samples
+    return mean_spectrum(frames_power(frames), frames.shape[-2], nperseg, sr)
+
+def spectral_features(xf, yf):
+    """
+    Calcule les descripteurs spectraux à partir d'un spectre de magnitude.
+    Retourne un dictionnaire (dominant_freq, mean_freq, bandwidth, spectral_centroid, spectral_rolloff).
+
+    - xf : fréquences (Hz)
+    - yf : magnitudes associées
+    """
+    features = {
+        "dominant_freq": 0,
+        "mean_freq": 0,
+        "bandwidth": 0,
+        "spectral_centroid": 0,
+        "spectral_rolloff": 0,
+    }
+    if len(yf) == 0:
+        return features
+
+    total = np.sum(yf)
+    features["dominant_freq"] = xf[np.argmax(yf)]
+    if total > 0:
+        features["mean_freq"] = np.sum(xf * yf) / total
+        features["bandwidth"] = np.sqrt(np.sum(((xf - features["mean_freq"]) ** 2) * yf) / total)
+        features["spectral_centroid"] = features["mean_freq"]
+
+    cumulative_energy = np.cumsum(yf)
+    rolloff_idx = np.where(cumulative_energy >= ROLLOFF_RATIO * cumulative_energy[-1])[0]
+    features["spectral_rolloff"] = xf[rolloff_idx[0]] if len(rolloff_idx) > 0 else 0
+    return features
+
+
+class StreamingQualityAccumulator:
+    """
+    Accumule bloc par bloc les métriques de qualité d'un signal mono float32, avec une mémoire bornée
+    quelle que soit la durée de l'audio : RMS, saturation, taux de passage par zéro, bruit hors parole
+    et spectre moyen de Welch (voir welch_spectrum : mêmes trames, donc mêmes valeurs que sur le signal entier).
+
+    Le gain de normalisation dépend du pic global : il n'est appliqué qu'à la fin, dans finalize().
+    La saturation est comptée sur un histogramme de |x| (précision d'une case, soit 1 / SATURATION_BINS).
+
+    - sr : fréquence d'échantillonnage
+    - frame_sec : durée des trames pour le spectre moyen
+    """
+    def __init__(self, sr, frame_sec=SPECTRUM_FRAME_SEC):
+        self.sr = sr
+        self.nperseg = spectrum_nperseg(sr, frame_sec)
+        self.hop = self.nperseg // 2
+
+        self.n = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.peak = 0.0
+        self.abs_hist = np.zeros(SATURATION_BINS, dtype=np.int64)
+
+        self.zero_crossings = 0
+        self._last_sign = None
+
+        self.noise_n = 0
+        self.noise_sum = 0.0
+        self.noise_sum_sq = 0.0
+        self.has_speech = False
+
+        self.spectrum_sum = np.zeros(self.nperseg // 2 + 1, dtype=np.float64)
+        self.n_frames = 0
+        self._tail = np.zeros(0, dtype=np.float32)
+
+        self.envelope_t = []
+        self.envelope_min = []
+        self.envelope_max = []
+
+    def update(self, samples, speech_mask=None):
+        """
+        Ajoute un bloc de signal (valeurs dans [-1, 1]).
+
+        - samples : bloc mono float32
+        - speech_mask : masque booléen de la parole dans le bloc (None si pas de VAD)
+        """
+        if len(samples) == 0:
+            return
+        offset = self.n
+        samples64 = samples.astype(np.float64)
+        abs_samples = np.abs(samples)
+
+        self.n += len(samples)
+        self.sum += samples64.sum()
+        self.sum_sq += np.dot(samples64, samples64)
+        self.peak = max(self.peak, float(abs_samples.max()))
+        bins = np.minimum((abs_samples * SATURATION_BINS).astype(np.int64), SATURATION_BINS - 1)
+        self.abs_hist += np.bincount(bins, minlength=SATURATION_BINS)
+
+        signs = np.signbit(samples)
+        self.zero_crossings += int(np.count_nonzero(signs[1:] != signs[:-1]))
+        if self._last_sign is not None and self._last_sign != signs[0]:
+            self.zero_crossings += 1
+        self._last_sign = signs[-1]
+
+        if speech_mask is not None and speech_mask.any():
+            self.has_speech = True
+            noise = samples64[~speech_mask]
+        else:
+            noise = samples64
+        self.noise_n += len(noise)
+        self.noise_sum += noise.sum()
+        self.noise_sum_sq += np.dot(noise, noise)
+
+        self._update_spectrum(samples)
+        self._update_envelope(samples, offset)
+
+    def _update_spectrum(self, samples):
+        buf = np.concatenate([self._tail, samples])
+        frames = spectrum_frames(buf, self.nperseg)
+        if len(frames):
+            self._add_frames(frames)
+            buf = buf[len(frames) * self.hop:]
+        self._tail = buf
+
+    def _add_frames(self, frames):
+        self.spectrum_sum += frames_power(frames)
+        self.n_frames += len(frames)
+
+    def _update_envelope(self, samples, offset):
+        t, lower, upper = minmax_envelope(samples, self.sr, ENVELOPE_POINTS_PER_BLOCK, offset)
+        self.envelope_t.append(t)
+        self.envelope_min.append(lower)
+        self.envelope_max.append(upper)
+
+    def saturation_count(self):
+        threshold = SATURATION_RATIO * self.peak * SATURATION_BINS
+        k = int(threshold)
+        if k >= SATURATION_BINS:
+            return int(self.abs_hist[-1])
+        # la case qui contient le seuil est comptée au prorata
+        partial = self.abs_hist[k] * (k + 1 - threshold)
+        return int(round(self.abs_hist[k + 1:].sum() + partial))
+
+    def spectrum(self):
+        if self.n_frames == 0 and len(self._tail) > 0:
+            frame = np.zeros(self.nperseg, dtype=np.float32)
+            frame[:len(self._tail)] = self._tail
+            self._add_frames(frame[np.newaxis, :])
+            self._tail = np.zeros(0, dtype=np.float32)
+        return mean_spectrum(self.spectrum_sum, self.n_frames, self.nperseg, self.sr)
+
+    def envelope(self):
+        if not self.envelope_t:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        return np.concatenate(self.envelope_t), np.concatenate(self.envelope_min), np.concatenate(self.envelope_max)
+
+    def finalize(self, headroom_db=NORMALIZE_HEADROOM_DB):
+        """
+        Retourne les métriques finales (mêmes définitions que l'analyse du fichier entier),
+        après normalisation crête à -headroom_db dBFS.
+        """
+        gain = (10 ** (-headroom_db / 20)) / self.peak if self.peak > 0 else 1
+        peak_scale = 1 / self.peak if self.peak > 0 else 1
+
+        if self.has_speech and self.noise_n > 0:
+            n, s, s2 = self.noise_n, self.noise_sum, self.noise_sum_sq
+        elif self.has_speech:
+            n, s, s2 = 0, 0.0, 0.0
+        else:
+            n, s, s2 = self.n, self.sum, self.sum_sq
+        noise_std = np.sqrt(max(s2 / n - (s / n) ** 2, 0.0)) if n > 0 else 0
+
+        metrics = {
+            "rms": int(np.sqrt(self.sum_sq / self.n) * gain * INT16_MAX) if self.n > 0 else 0,
+            "saturation_count": self.saturation_count(),
+            "zero_crossing_rate": self.zero_crossings / self.n if self.n > 0 else 0,
+            "noise_level": noise_std * peak_scale,
+            "normalize_gain": gain,
+            "peak_scale": peak_scale,
+        }
+        metrics.update(spectral_features(*self.spectrum()))
+        return metrics
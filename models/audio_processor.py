@@ -1,17 +1,21 @@
 import os
-import csv
-import threading
-import uuid
+import time
+import shutil
+from math import gcd
 import numpy as np
-import matplotlib
-matplotlib.use("Agg")
-
-import matplotlib.pyplot as plt
-from scipy.fft import rfft, rfftfreq
-from pedalboard import Pedalboard, HighpassFilter, LowpassFilter, Compressor, NoiseGate, Reverb
+import torch
+from scipy.signal import resample_poly
+import pedalboard
+from pedalboard import Pedalboard
 from pedalboard.io import AudioFile
-from pydub import AudioSegment, effects
-from silero_vad import load_silero_vad, read_audio, get_speech_timestamps
+import quality_plots
+from vad_pool import get_vad_pool
+from quality_log import get_quality_log
+from content_cache import file_sha256, config_fingerprint
+from audio_metrics import (
+    StreamingQualityAccumulator, spectral_features, welch_spectrum,
+    NORMALIZE_HEADROOM_DB, INT16_MAX, SATURATION_RATIO, SPECTRUM_FRAME_SEC
+)
 
 MIN_RMS = 2000
 MAX_RMS = 4000  
@@ -20,22 +24,158 @@ MAX_NOISE_LEVEL = 0.25
 MIN_SPECTRAL_CENTROID = 600 
 MAX_SPECTRAL_CENTROID = 1200
 
-PLOT_LOCK = threading.Lock()
+# chaîne Pedalboard : (nom de l'effet, paramètres)
+PEDALBOARD_CHAIN = [
+    ("HighpassFilter", {"cutoff_frequency_hz": 100}),
+    ("LowpassFilter", {"cutoff_frequency_hz": 1300}),
+    ("Compressor", {"threshold_db": -20, "ratio": 3.0}),
+    ("NoiseGate", {"threshold_db": -45, "ratio": 3.0}),
+    ("Reverb", {"room_size": 0.1, "damping": 0.8, "wet_level": 0.05, "dry_level": 0.95}),
+]
+
+# paramètres du VAD (une seule passe, partagée par l'estimation du bruit et le nettoyage)
+VAD_SAMPLING_RATE = 16000
+VAD_THRESHOLD = 0.2
+VAD_MIN_SPEECH_MS = 150
+VAD_SPEECH_PAD_MS = 300
+MIN_SEGMENT_MS = 100
+
+# au-delà de cette durée, le fichier est analysé par blocs (mémoire bornée)
+STREAMING_MIN_DURATION_SEC = 20 * 60
+STREAM_BLOCK_SEC = 30
+
+# niveau 1 : pré-filtre rapide sur le fichier brut, avant la chaîne Pedalboard + VAD ; au plus PRESCREEN_MAX_SEC
+# secondes lues, en PRESCREEN_WINDOWS fenêtres réparties sur tout le fichier (pas seulement le début)
+PRESCREEN_MAX_SEC = 60
+PRESCREEN_WINDOWS = 12
+PRESCREEN_MIN_DURATION_SEC = 2
+PRESCREEN_MIN_RMS = 100               # échelle int16, avant normalisation : fichier quasi muet
+PRESCREEN_CLIPPING_LEVEL = 0.999
+PRESCREEN_MAX_CLIPPING_RATIO = 0.05
+PRESCREEN_SILENCE_CHUNK_MS = 100
+PRESCREEN_SILENCE_DB = 16             # un bloc est silencieux s'il est 16 dB sous le niveau global
+PRESCREEN_MAX_SILENCE_RATIO = 0.8
+
+# à incrémenter quand le traitement change sans que la configuration ci-dessus ne change (invalide le cache)
+PROCESSING_VERSION = 3
+
+METRIC_FIELDS = [
+    "duration_sec", "rms", "saturation_count", "dominant_freq", "mean_freq", "bandwidth",
+    "noise_level", "spectral_centroid", "spectral_rolloff", "zero_crossing_rate",
+    "clipping_ratio", "silence_ratio", "raw_rms",
+    "should_reject", "rejection_reasons", "rejection_tier",
+]
+
+def build_board():
+    return Pedalboard([getattr(pedalboard, name)(**params) for name, params in PEDALBOARD_CHAIN])
+
+def processing_config():
+    """
+    Configuration qui détermine le résultat du traitement (chaîne, VAD, seuils) : sert de clé de cache.
+    """
+    return {
+        "version": PROCESSING_VERSION,
+        "pedalboard": PEDALBOARD_CHAIN,
+        "normalize_headroom_db": NORMALIZE_HEADROOM_DB,
+        "vad": [VAD_SAMPLING_RATE, VAD_THRESHOLD, VAD_MIN_SPEECH_MS, VAD_SPEECH_PAD_MS, MIN_SEGMENT_MS],
+        "thresholds": [MIN_RMS, MAX_RMS, MAX_SATURATION_FRAMES, MAX_NOISE_LEVEL,
+                       MIN_SPECTRAL_CENTROID, MAX_SPECTRAL_CENTROID],
+        "prescreen": [PRESCREEN_MAX_SEC, PRESCREEN_WINDOWS, PRESCREEN_MIN_DURATION_SEC, PRESCREEN_MIN_RMS,
+                      PRESCREEN_CLIPPING_LEVEL, PRESCREEN_MAX_CLIPPING_RATIO, PRESCREEN_SILENCE_CHUNK_MS, PRESCREEN_SILENCE_DB,
+                      PRESCREEN_MAX_SILENCE_RATIO],
+        "streaming": [STREAMING_MIN_DURATION_SEC, STREAM_BLOCK_SEC],
+        "spectrum": SPECTRUM_FRAME_SEC,
+    }
+
+def to_mono(audio):
+    """
+    Convertit un buffer pedalboard (canaux, échantillons) en signal mono 1D.
+    """
+    if audio.ndim == 1:
+        return audio
+    if audio.shape[0] == 1:
+        return audio[0]
+    return audio.mean(axis=0)
+
+def normalize_peak(samples, headroom_db=NORMALIZE_HEADROOM_DB):
+    """
+    Normalisation crête en place (équivalent de pydub.effects.normalize) : le pic est ramené à -headroom_db dBFS.
+    """
+    peak = np.max(np.abs(samples)) if len(samples) > 0 else 0
+    if peak > 0:
+        samples *= (10 ** (-headroom_db / 20)) / peak
+    return samples
+
+def resample(samples, sr, target_sr):
+    if sr == target_sr:
+        return samples
+    g = gcd(int(sr), int(target_sr))
+    return resample_poly(samples, int(target_sr) // g, int(sr) // g).astype(np.float32)
+
+def read_spread(f, max_frames, n_windows=PRESCREEN_WINDOWS, align=1):
+    """
+    Lit au plus max_frames échantillons d'un AudioFile ouvert, répartis sur tout le fichier : n_windows fenêtres
+    de même longueur (multiple de align), régulièrement espacées. Fichier lu en entier s'il est assez court.
+    Retourne le signal mono des fenêtres mises bout à bout.
+    """
+    if f.frames <= max_frames or n_windows <= 1:
+        return to_mono(f.read(int(min(f.frames, max_frames))))
+    window = max(max_frames // n_windows // align * align, align)
+    step = (f.frames - window) / (n_windows - 1)
+    parts = []
+    for k in range(n_windows):
+        f.seek(int(k * step))
+        parts.append(to_mono(f.read(window)))
+    return np.concatenate(parts)
+
+def speech_mask(speech_timestamps, n, sr):
+    """
+    Masque booléen des échantillons de parole (timestamps du VAD en échantillons à 16 kHz).
+    """
+    mask = np.zeros(n, dtype=bool)
+    for seg in speech_timestamps:
+        start_idx = max(0, min(int(seg['start'] * sr / VAD_SAMPLING_RATE), n))
+        end_idx = max(0, min(int(seg['end'] * sr / VAD_SAMPLING_RATE), n))
+        mask[start_idx:end_idx] = True
+    return mask
+
+def speech_sample_ranges(speech_timestamps, sr):
+    """
+    Intervalles (début, fin) en échantillons à garder dans l'audio nettoyé,
+    arrondis à la milliseconde et sans les segments de moins de MIN_SEGMENT_MS.
+    """
+    ranges = []
+    for seg in speech_timestamps:
+        start_ms = seg['start'] * 1000 // VAD_SAMPLING_RATE
+        end_ms = seg['end'] * 1000 // VAD_SAMPLING_RATE
+        if (end_ms - start_ms) >= MIN_SEGMENT_MS:
+            ranges.append((start_ms * sr // 1000, end_ms * sr // 1000))
+    return ranges
 
 class AudioProcessor:
-    def __init__(self, audio_path, verbose=True):
+    def __init__(self, audio_path, verbose=True, vad_pool=None, streaming=None, block_sec=STREAM_BLOCK_SEC,
+                 prescreen=True, plot_mode=None, cache=None, quality_log=None):
         self.audio_path = audio_path
         self.cleaned_path = audio_path.replace(".wav", "_cleaned.wav")
-        self.original_audio = AudioSegment.from_wav(audio_path)
-        self.preprocessed_audio = None
-        self.val_model = load_silero_vad()
+        # signal prétraité : un seul buffer float32 mono, partagé par toutes les étapes
+        self.samples = None
+        self.sr = None
+        self.vad_pool = vad_pool or get_vad_pool()
+        self.speech_timestamps = None
         self.should_reject = False
         self.rejection_reasons = []
+        # niveau qui a pris la décision de rejet : "prescreen" ou "full"
+        self.rejection_tier = None
+        self.use_prescreen = prescreen
+        self.prescreen_time = 0
+        self.analysis_time = 0
 
         # metrics
         self.rms = 0
+        # RMS du fichier brut (pré-filtre, avant normalisation) : échelle différente de rms
+        self.raw_rms = None
         self.saturation_count = 0
-        self.duration_sec = len(self.original_audio) / 1000
+        self.duration_sec = 0
         self.dominant_freq = 0
         self.mean_freq = 0
         self.bandwidth = 0
@@ -43,60 +183,69 @@ class AudioProcessor:
         self.spectral_centroid = 0
         self.spectral_rolloff = 0
         self.zero_crossing_rate = 0
+        self.peak_scale = 1
+        self.clipping_ratio = 0
+        self.silence_ratio = 0
 
         self.verbose = verbose
-        self.enhanced_samples = None
-
-        self.plot_id = str(uuid.uuid4())[:8]
+        # None : mode streaming choisi automatiquement selon la durée du fichier
+        self.streaming = streaming
+        self.block_sec = block_sec
+        self.normalize_gain = 1
+
+        # "off" / "summary" / "async" / "sync" (voir quality_plots.PLOT_MODES)
+        self.plot_mode = plot_mode or quality_plots.PLOT_MODE
+        # cache content_cache.ContentCache (None : pas de cache)
+        self.cache = cache
+        self.from_cache = False
+        # quality_log.QualityLog (None : journal partagé du processus)
+        self.quality_log = quality_log
 
     def preprocess(self):
+        # un seul décodage du fichier, en float32
         with AudioFile(self.audio_path) as f:
             audio = f.read(f.frames) 
             sr = f.samplerate
+        self.duration_sec = audio.shape[-1] / sr
 
-            board = Pedalboard([
-                HighpassFilter(cutoff_frequency_hz=100),
-                LowpassFilter(cutoff_frequency_hz=1300),
-                Compressor(threshold_db=-20, ratio=3.0),
-                NoiseGate(threshold_db=-45, ratio=3.0),
-                Reverb(room_size=0.1, damping=0.8, wet_level=0.05, dry_level=0.95),
-            ])
-            effected = board(audio, sample_rate=sr)
-
-        # Convertir les données audio en AudioSegment directement
-        # effected est un array numpy, on le convertit en bytes pour pydub
-        if len(effected.shape) == 1:
-            effected = effected.reshape(1, -1)
-        
-        # Convertir en int16 pour pydub, clip pour éviter la saturation
-        effected_clipped = np.clip(effected * 32767, -32767, 32767).astype(np.int16)
-        
-        # Créer un AudioSegment à partir des données
-        audio_segment = AudioSegment(
-            effected_clipped.tobytes(),
-            frame_rate=int(sr),
-            sample_width=2,  # 16-bit = 2 bytes
-            channels=1
-        )
-        
-        self.preprocessed_audio = effects.normalize(audio_segment, headroom=6.0)
+        effected = build_board()(audio, sample_rate=sr)
 
-    def analyze_quality(self):
-        audio = self.preprocessed_audio
-        self.rms = audio.rms
+        # mono + clip comme l'ancienne conversion en int16, puis normalisation en place
+        samples = np.clip(to_mono(effected), -1.0, 1.0).astype(np.float32, copy=False)
+        self.samples = normalize_peak(samples)
+        self.sr = int(sr)
+        self.speech_timestamps = None
 
-        samples = np.array(audio.get_array_of_samples()).astype(np.float32)
-        if audio.channels == 2:
-            samples = samples.reshape((-1, 2)).mean(axis=1)
+    def detect_speech(self):
+        """
+        Lance le VAD une seule fois, en mémoire, sur l'audio prétraité (float32, 16 kHz, mono).
+        Les timestamps (en échantillons à 16 kHz) sont gardés dans self.speech_timestamps
+        et réutilisés par l'estimation du bruit et par apply_vad.
+        """
+        wav = resample(self.samples, self.sr, VAD_SAMPLING_RATE)
+
+        self.speech_timestamps = self.vad_pool.get_speech_timestamps(
+            torch.from_numpy(wav), sampling_rate=VAD_SAMPLING_RATE,
+            threshold=VAD_THRESHOLD, min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+            speech_pad_ms=VAD_SPEECH_PAD_MS
+        )
+        return self.speech_timestamps
 
-        if len(samples) > 0:
-            samples = samples / np.max(np.abs(samples)) if np.max(np.abs(samples)) > 0 else samples
+    def analyze_quality(self):
+        samples = self.samples
+        # RMS exprimé sur l'échelle int16, comme pydub
+        self.rms = int(np.sqrt(np.mean(np.square(samples, dtype=np.float64))) * INT16_MAX) if len(samples) > 0 else 0
 
-        max_sample = np.max(np.abs(samples))
-        self.saturation_count = np.sum(np.abs(samples) >= max_sample * 0.95)
+        # les métriques sont calculées sur le signal ramené à un pic de 1,
+        # sans copie : seul le niveau de bruit dépend de l'échelle
+        abs_samples = np.abs(samples)
+        max_sample = np.max(abs_samples) if len(samples) > 0 else 0
+        self.saturation_count = np.sum(abs_samples >= max_sample * SATURATION_RATIO)
+        del abs_samples
+        self.peak_scale = 1 / max_sample if max_sample > 0 else 1
 
-        self.analyze_speech_quality(samples, audio.frame_rate)
-        self.analyze_frequency(samples, audio.frame_rate)
+        self.analyze_speech_quality(samples, self.sr)
+        self.analyze_frequency(samples, self.sr)
 
         self.check_rejection_criteria()
 
@@ -116,33 +265,18 @@ class AudioProcessor:
         
         """
         try:
-            tmp_path = self.audio_path.replace(".wav", "_noise_tmp.wav")
-            self.preprocessed_audio.export(tmp_path, format="wav")
-
-            wav = read_audio(tmp_path, sampling_rate=16000)
-            speech_segments = get_speech_timestamps(
-                wav, self.val_model, sampling_rate=16000,
-                threshold=0.3, min_speech_duration_ms=100
-            )
-
-            os.remove(tmp_path)
+            if self.speech_timestamps is None:
+                self.detect_speech()
+            speech_segments = self.speech_timestamps
 
             if speech_segments:
-                speech_mask = np.zeros(len(samples), dtype=bool)
-                for seg in speech_segments:
-                    start_idx = int(seg['start'] * sr / 16000)
-                    end_idx = int(seg['end'] * sr / 16000)
-                    start_idx = max(0, min(start_idx, len(samples)))
-                    end_idx = max(0, min(end_idx, len(samples)))
-                    speech_mask[start_idx:end_idx] = True
-
-                noise_samples = samples[~speech_mask]
+                noise_samples = samples[~speech_mask(speech_segments, len(samples), sr)]
                 if len(noise_samples) > 0:
-                    self.noise_level = np.std(noise_samples)
+                    self.noise_level = np.std(noise_samples) * self.peak_scale
                 else:
                     self.noise_level = 0
             else:
-                self.noise_level = np.std(samples)
+                self.noise_level = np.std(samples) * self.peak_scale
             
         except Exception as e:
             if self.verbose:
@@ -150,30 +284,128 @@ class AudioProcessor:
             self.noise_level = 1.0
 
     def analyze_frequency(self, samples, sr):
-        samples = samples - np.mean(samples)
-        n = len(samples)
-        yf = np.abs(rfft(samples))/ n
-        xf = rfftfreq(n, 1 / sr)
-
-        if len(yf) > 0:
-            self.dominant_freq = xf[np.argmax(yf)]
-            self.mean_freq = np.sum(xf * yf) / np.sum(yf) if np.sum(yf) > 0 else 0
-            self.bandwidth = np.sqrt(np.sum(((xf - self.mean_freq) ** 2) * yf) / np.sum(yf)) if np.sum(yf) > 0 else 0
-
-            self.spectral_centroid = np.sum(xf * yf) / np.sum(yf) if np.sum(yf) > 0 else 0
-
-            cumulative_energy = np.cumsum(yf)
-            total_energy = cumulative_energy[-1]
-            rolloff_idx = np.where(cumulative_energy >= 0.85 * total_energy)[0]
-            self.spectral_rolloff = xf[rolloff_idx[0]] if len(rolloff_idx) > 0 else 0
+        # spectre moyen de Welch, comme l'analyse par blocs et le tri par lots : mêmes seuils partout
+        xf, yf = welch_spectrum(samples, sr)
+        self.set_spectral_features(spectral_features(xf, yf))
+
+        self.save_plot(samples, sr, xf, yf * self.peak_scale)
+
+    def set_spectral_features(self, features):
+        self.dominant_freq = features["dominant_freq"]
+        self.mean_freq = features["mean_freq"]
+        self.bandwidth = features["bandwidth"]
+        self.spectral_centroid = features["spectral_centroid"]
+        self.spectral_rolloff = features["spectral_rolloff"]
+
+    def use_streaming(self):
+        if self.streaming is not None:
+            return self.streaming
+        if not self.duration_sec:
+            with AudioFile(self.audio_path) as f:
+                self.duration_sec = f.frames / f.samplerate
+        return self.duration_sec >= STREAMING_MIN_DURATION_SEC
+
+    def prescreen(self):
+        """
+        Niveau 1 : métriques peu coûteuses sur le fichier brut (durée lue dans l'en-tête, puis
+        RMS, taux d'écrêtage et taux de silence sur PRESCREEN_MAX_SEC secondes réparties sur tout le fichier :
+        une attente ou un silence en début d'appel ne suffit pas à rejeter le fichier).
+        Rejette les échecs évidents avant la chaîne Pedalboard, le VAD et la FFT.
+        """
+        with AudioFile(self.audio_path) as f:
+            sr = f.samplerate
+            self.duration_sec = f.frames / sr
+            chunk = max(int(sr * PRESCREEN_SILENCE_CHUNK_MS / 1000), 1)
+            raw = read_spread(f, int(PRESCREEN_MAX_SEC * sr), align=chunk)
+
+        self.raw_rms = int(np.sqrt(np.mean(np.square(raw, dtype=np.float64))) * INT16_MAX) if len(raw) > 0 else 0
+        self.clipping_ratio = np.count_nonzero(np.abs(raw) >= PRESCREEN_CLIPPING_LEVEL) / max(len(raw), 1)
+
+        # taux de silence : blocs de 100 ms nettement sous le niveau global (comme remove_noises)
+        n_chunks = len(raw) // chunk
+        if n_chunks > 0:
+            chunk_rms = np.sqrt(np.mean(np.square(raw[:n_chunks * chunk].reshape(n_chunks, chunk), dtype=np.float64), axis=1))
+            global_rms = np.sqrt(np.mean(np.square(raw, dtype=np.float64)))
+            silence_level = global_rms * 10 ** (-PRESCREEN_SILENCE_DB / 20)
+            self.silence_ratio = np.count_nonzero(chunk_rms < silence_level) / n_chunks
         else:
-            self.dominant_freq = 0
-            self.mean_freq = 0
-            self.bandwidth = 0
-            self.spectral_centroid = 0
-            self.spectral_rolloff = 0
+            self.silence_ratio = 1.0
+
+        self.should_reject = False
+        self.rejection_reasons = []
+        if self.duration_sec < PRESCREEN_MIN_DURATION_SEC:
+            self.rejection_reasons.append(f"Audio trop court: {self.duration_sec:.1f}s")
+        if self.raw_rms < PRESCREEN_MIN_RMS:
+            self.rejection_reasons.append(f"Signal quasi muet (RMS brut): {self.raw_rms}")
+        if self.clipping_ratio > PRESCREEN_MAX_CLIPPING_RATIO:
+            self.rejection_reasons.append(f"Écrêtage excessif: {self.clipping_ratio:.1%}")
+        if self.silence_ratio > PRESCREEN_MAX_SILENCE_RATIO:
+            self.rejection_reasons.append(f"Silence excessif: {self.silence_ratio:.0%}")
+
+        if self.rejection_reasons:
+            self.should_reject = True
+            self.rejection_tier = "prescreen"
+            # l'analyse complète n'a pas lieu : pas de RMS après normalisation
+            self.rms = None
+            if self.verbose:
+                print(f"Audio rejeté (pré-filtre) - Raisons: {', '.join(self.rejection_reasons)}")
+
+    def iter_processed_blocks(self):
+        """
+        Lit le fichier par blocs de block_sec secondes et applique la chaîne Pedalboard bloc par bloc
+        (l'état des effets est conservé d'un bloc à l'autre). Renvoie des blocs mono float32 non normalisés.
+        """
+        board = build_board()
+        with AudioFile(self.audio_path) as f:
+            sr = f.samplerate
+            block_frames = int(self.block_sec * sr)
+            while f.tell() < f.frames:
+                block = f.read(block_frames)
+                effected = board(block, sample_rate=sr, reset=False)
+                yield np.clip(to_mono(effected), -1.0, 1.0).astype(np.float32, copy=False)
 
-        self.save_plot(samples, sr, xf, yf)
+    def analyze_quality_streaming(self):
+        """
+        Équivalent de preprocess + analyze_quality avec une mémoire bornée : le VAD et les métriques
+        sont calculés bloc par bloc, seuls les timestamps de parole et les accumulateurs sont conservés.
+        """
+        with AudioFile(self.audio_path) as f:
+            self.sr = int(f.samplerate)
+            self.duration_sec = f.frames / f.samplerate
+
+        acc = StreamingQualityAccumulator(self.sr)
+        self.speech_timestamps = []
+        offset = 0
+        for block in self.iter_processed_blocks():
+            timestamps = self.vad_pool.get_speech_timestamps(
+                torch.from_numpy(resample(block, self.sr, VAD_SAMPLING_RATE)), sampling_rate=VAD_SAMPLING_RATE,
+                threshold=VAD_THRESHOLD, min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+                speech_pad_ms=VAD_SPEECH_PAD_MS
+            )
+            acc.update(block, speech_mask(timestamps, len(block), self.sr))
+
+            # timestamps ramenés au début du fichier
+            offset_16k = offset * VAD_SAMPLING_RATE // self.sr
+            self.speech_timestamps.extend(
+                {"start": seg["start"] + offset_16k, "end": seg["end"] + offset_16k} for seg in timestamps
+            )
+            offset += len(block)
+
+        metrics = acc.finalize()
+        self.rms = metrics["rms"]
+        self.saturation_count = metrics["saturation_count"]
+        self.zero_crossing_rate = metrics["zero_crossing_rate"]
+        self.noise_level = metrics["noise_level"]
+        self.peak_scale = metrics["peak_scale"]
+        self.normalize_gain = metrics["normalize_gain"]
+        self.set_spectral_features(metrics)
+
+        xf, yf = acc.spectrum()
+        t, lower, upper = acc.envelope()
+        self.save_plot(None, self.sr, xf, yf * self.peak_scale,
+                       envelope=(t, lower * self.peak_scale, upper * self.peak_scale))
+
+        self.check_rejection_criteria()
 
     def check_rejection_criteria(self):
         """
@@ -200,117 +432,165 @@ class AudioProcessor:
             self.should_reject = True
             self.rejection_reasons.append(f"Centroïde spectral hors limites: {self.spectral_centroid:.0f}Hz")
 
+        self.rejection_tier = "full" if self.should_reject else None
         if self.verbose and self.should_reject:
             print(f"Audio rejeté - Raisons: {', '.join(self.rejection_reasons)}")
 
-    def save_plot(self, samples, sr, xf, yf):
+    def save_plot(self, samples, sr, xf, yf, envelope=None):
+        """
+        Prépare le résumé compact du graphique de qualité et le confie à quality_plots
+        selon self.plot_mode (aucun rendu matplotlib dans le thread de traitement, sauf en mode "sync").
+        """
+        if self.plot_mode == "off":
+            return
         base = os.path.splitext(os.path.basename(self.audio_path))[0]
 
-        with PLOT_LOCK:
-            fig = plt.figure(figsize=(12, 8))
-
-            try:
-                # Signal temporel
-                plt.subplot(2, 2, 1)
-                t = np.arange(len(samples)) / sr
-                plt.plot(t, samples, color='gray', alpha=0.7)
-                plt.title(f"{base} - Signal temporel")
-                plt.xlabel("Temps (s)")
-                plt.ylabel("Amplitude")
-
-                # Spectre fréquentiel
-                plt.subplot(2, 2, 2)
-                plt.plot(xf, yf, color='blue')
-                plt.axvline(self.spectral_centroid, color='red', linestyle='--', label=f'Centroïde: {self.spectral_centroid:.0f}Hz')
-                plt.title("Spectre fréquentiel")
-                plt.xlabel("Fréquence (Hz)")
-                plt.ylabel("Magnitude")
-                plt.legend()
-
-                # Métriques de qualité
-                plt.subplot(2, 2, 3)
-                metrics = [
-                    f"RMS: {self.rms}",
-                    f"Bruit: {self.noise_level:.2f}",
-                    f"Centroïde: {self.spectral_centroid:.0f}Hz"
-                ]
-                for i, metric in enumerate(metrics):
-                    plt.text(0.1, 0.9 - i*0.15, metric, transform=plt.gca().transAxes)
-                plt.title("Métriques de qualité")
-                plt.axis('off')
-
-                plt.tight_layout()
-                os.makedirs("plots", exist_ok=True)
-                temp_path = f"plots/{base}_{self.plot_id}.png"
-                final_path = f"plots/{base}.png"
-                
-                plt.savefig(temp_path, dpi=150, bbox_inches='tight')
-                
-                # Renommer le fichier temporaire vers le nom final
-                if os.path.exists(temp_path):
-                    if os.path.exists(final_path):
-                        os.remove(final_path)
-                    os.rename(temp_path, final_path)
-                
-            finally:
-                # Nettoyer la figure pour éviter les fuites mémoire
-                plt.close(fig)
-                plt.clf()  # Clear current figure
-                plt.cla()  # Clear current axes
+        if envelope is not None:
+            # mode streaming : enveloppe min/max déjà calculée bloc par bloc
+            t, lower, upper = envelope
+        else:
+            t, lower, upper = quality_plots.minmax_envelope(samples, sr)
+            lower, upper = lower * self.peak_scale, upper * self.peak_scale
+
+        summary = quality_plots.build_summary(base, t, lower, upper, xf, yf, {
+            "rms": self.rms,
+            "noise_level": self.noise_level,
+            "spectral_centroid": self.spectral_centroid,
+        })
+        quality_plots.dispatch(summary, self.plot_mode)
 
     def apply_vad(self):
-        tmp_path = self.audio_path.replace(".wav", "_tmp.wav")
-        self.preprocessed_audio.export(tmp_path, format="wav")
-        wav = read_audio(tmp_path, sampling_rate=16000)
-        speech_segments = get_speech_timestamps(
-            wav, self.val_model, sampling_rate=16000,
-            threshold=0.2, min_speech_duration_ms=150,
-            speech_pad_ms=300
+        if self.speech_timestamps is None:
+            self.detect_speech()
+
+        pieces = [self.samples[start:end] for start, end in speech_sample_ranges(self.speech_timestamps, self.sr)]
+        cleaned = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+
+        # seule conversion en int16 : à l'écriture du fichier
+        with AudioFile(self.cleaned_path, "w", samplerate=self.sr, num_channels=1, bit_depth=16) as f:
+            f.write(cleaned.reshape(1, -1))
+
+    def apply_vad_streaming(self):
+        """
+        Écrit l'audio nettoyé bloc par bloc : la chaîne Pedalboard est rejouée depuis le début
+        et seuls les intervalles de parole trouvés pendant l'analyse sont écrits, avec le gain de normalisation.
+        """
+        ranges = speech_sample_ranges(self.speech_timestamps, self.sr)
+        idx = 0
+        offset = 0
+        with AudioFile(self.cleaned_path, "w", samplerate=self.sr, num_channels=1, bit_depth=16) as out:
+            for block in self.iter_processed_blocks():
+                block_end = offset + len(block)
+                while idx < len(ranges) and ranges[idx][0] < block_end:
+                    start, end = ranges[idx]
+                    piece = block[max(start, offset) - offset:min(end, block_end) - offset]
+                    if len(piece) > 0:
+                        out.write((piece * self.normalize_gain).reshape(1, -1))
+                    if end > block_end:
+                        break  # l'intervalle continue dans le bloc suivant
+                    idx += 1
+                offset = block_end
+
+    def cleaned_speech_timestamps(self):
+        """
+        Timestamps de parole dans l'audio nettoyé (en échantillons à 16 kHz) : chaque intervalle gardé
+        par apply_vad y devient un segment contigu. None si le VAD n'a pas tourné (résultat repris du cache).
+        """
+        if self.speech_timestamps is None:
+            return None
+        timestamps = []
+        offset = 0
+        for start, end in speech_sample_ranges(self.speech_timestamps, self.sr):
+            timestamps.append({
+                "start": offset * VAD_SAMPLING_RATE // self.sr,
+                "end": (offset + end - start) * VAD_SAMPLING_RATE // self.sr,
+            })
+            offset += end - start
+        return timestamps
+
+    def log_quality(self):
+        """
+        Envoie les métriques au journal de qualité (SQLite, écrit par un thread dédié) sans attendre l'écriture.
+        """
+        row = self.metrics()
+        row.update(
+            file=os.path.basename(self.audio_path),
+            duration=row.pop("duration_sec"),
+            rejected=int(row.pop("should_reject")),
+            rejection_reasons="; ".join(self.rejection_reasons),
+            prescreen_time=self.prescreen_time,
+            analysis_time=self.analysis_time,
+            from_cache=int(self.from_cache),
         )
-        os.remove(tmp_path)
-
-        cleaned = AudioSegment.empty()
-        for seg in speech_segments:
-            start_ms = seg['start'] * 1000 // 16000
-            end_ms = seg['end'] * 1000 // 16000
-            if (end_ms - start_ms) >= 100:
-                cleaned += self.preprocessed_audio[start_ms:end_ms]
-            
-        cleaned.export(self.cleaned_path, format="wav")
-
-    def log_to_csv(self, output_csv="audio_quality_log.csv"):
-        file_exists = os.path.isfile(output_csv)
-        with open(output_csv, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow([
-                    "file", "duration", "rms", "saturation_count", 
-                    "dominant_freq", "mean_freq", "bandwidth", 
-                    "noise_level", "spectral_centroid", 
-                    "spectral_rolloff", "zero_crossing_rate",
-                    "rejected", "rejection_reasons"
-                ])
-
-            writer.writerow([
-                os.path.basename(self.audio_path),
-                round(self.duration_sec, 2),
-                self.rms,
-                self.saturation_count,
-                round(self.dominant_freq, 2),
-                round(self.mean_freq, 2),
-                round(self.bandwidth, 2),
-                round(self.noise_level, 3),
-                round(self.spectral_centroid, 2),
-                round(self.spectral_rolloff, 2),
-                round(self.zero_crossing_rate, 4),
-                self.should_reject,
-                "; ".join(self.rejection_reasons) if self.rejection_reasons else ""
-            ])
+        (self.quality_log or get_quality_log()).log(row)
+
+    def metrics(self):
+        """
+        Métriques de qualité et décision, sous forme de dictionnaire sérialisable.
+        """
+        metrics = {field: getattr(self, field) for field in METRIC_FIELDS}
+        for field, value in metrics.items():
+            if isinstance(value, np.generic):
+                metrics[field] = value.item()
+        return metrics
+
+    def cache_key(self):
+        config = dict(processing_config(), prescreen_enabled=self.use_prescreen,
+                      streaming=self.streaming, block_sec=self.block_sec)
+        return self.cache.make_key(file_sha256(self.audio_path), config_fingerprint(config))
+
+    def restore_from_cache(self, entry):
+        """
+        Recharge les métriques, la décision et l'audio nettoyé d'une entrée du cache.
+        Retourne False si l'entrée est incomplète (elle est alors recalculée).
+        """
+        try:
+            meta = self.cache.load_meta(entry)
+            if not meta["should_reject"]:
+                shutil.copyfile(os.path.join(entry, "cleaned.wav"), self.cleaned_path)
+        except (OSError, ValueError, KeyError):
+            return False
+        for field in METRIC_FIELDS:
+            setattr(self, field, meta[field])
+        self.from_cache = True
+        if self.verbose:
+            print(f"Résultat repris du cache pour {self.audio_path}")
+        return True
 
     def process(self):
-        self.preprocess()
-        self.analyze_quality()
-        if not self.should_reject:
-            self.apply_vad()
-        self.log_to_csv()
-        return not self.should_reject
\ No newline at end of file
+        if self.cache is not None:
+            key = self.cache_key()
+            entry = self.cache.get(key)
+            if entry is not None and self.restore_from_cache(entry):
+                self.log_quality()
+                return not self.should_reject
+
+        self.run()
+
+        if self.cache is not None:
+            files = {} if self.should_reject else {"cleaned.wav": self.cleaned_path}
+            self.cache.put(key, self.metrics(), files)
+        return not self.should_reject
+
+    def run(self):
+        if self.use_prescreen:
+            start = time.perf_counter()
+            self.prescreen()
+            self.prescreen_time = time.perf_counter() - start
+            if self.should_reject:
+                self.log_quality()
+                return
+
+        # niveau 2 : analyse complète, seulement pour les fichiers qui passent le pré-filtre
+        start = time.perf_counter()
+        if self.use_streaming():
+            self.analyze_quality_streaming()
+            if not self.should_reject:
+                self.apply_vad_streaming()
+        else:
+            self.preprocess()
+            self.analyze_quality()
+            if not self.should_reject:
+                self.apply_vad()
+        self.analysis_time = time.perf_counter() - start
+        self.log_quality()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from pedalboard.io import AudioFile
+from audio_processor import (
+    build_board, to_mono, resample, normalize_peak, speech_mask,
+    MIN_RMS, MAX_RMS, MAX_SATURATION_FRAMES, MAX_NOISE_LEVEL, MIN_SPECTRAL_CENTROID, MAX_SPECTRAL_CENTROID,
+    VAD_SAMPLING_RATE, VAD_THRESHOLD, VAD_MIN_SPEECH_MS, VAD_SPEECH_PAD_MS
+)
+from vad_pool import get_vad_pool
+from audio_metrics import (
+    spectrum_nperseg, spectrum_frames, frames_power, mean_spectrum,
+    NORMALIZE_HEADROOM_DB, INT16_MAX, SATURATION_RATIO, ROLLOFF_RATIO, SPECTRUM_FRAMES_PER_CHUNK
+)
+
+SCREEN_SR = 16000
+FILES_PER_BATCH = 64
+BUCKET_MAX_RATIO = 2          # dans une matrice, le signal le plus long fait au plus 2 fois le plus court
+NUM_WORKERS = 4
+
+def pad_buffers(buffers):
+    """
+    Empile N signaux mono de longueurs différentes dans une matrice (N, L) complétée par des zéros.
+    Retourne la matrice et le vecteur des longueurs.
+    """
+    lengths = np.array([len(b) for b in buffers], dtype=np.int64)
+    matrix = np.zeros((len(buffers), max(lengths.max(initial=0), 1)), dtype=np.float32)
+    for i, b in enumerate(buffers):
+        matrix[i, :len(b)] = b
+    return matrix, lengths
+
+def length_buckets(lengths, max_ratio=BUCKET_MAX_RATIO):
+    """
+    Regroupe les indices des signaux par longueurs proches : dans un groupe, le plus long fait au plus
+    max_ratio fois le plus court. Le remplissage par des zéros de pad_buffers reste ainsi borné
+    (un enregistrement très long forme son propre groupe au lieu d'agrandir toute la matrice).
+    """
+    buckets = []
+    for i in np.argsort(lengths, kind="stable"):
+        if buckets and lengths[i] <= max_ratio * max(lengths[buckets[-1][0]], 1):
+            buckets[-1].append(int(i))
+        else:
+            buckets.append([int(i)])
+    return buckets
+
+def vad_noise_level(samples, sr, vad_pool=None):
+    """
+    Niveau de bruit d'un signal, comme AudioProcessor.estimate_noise_level : écart-type des échantillons
+    hors parole (VAD sur le signal normalisé), ramené au pic. Même estimateur, donc même seuil MAX_NOISE_LEVEL.
+    """
+    peak = np.max(np.abs(samples)) if len(samples) > 0 else 0
+    if peak == 0:
+        return 0.0
+    try:
+        wav = resample(normalize_peak(samples.copy()), sr, VAD_SAMPLING_RATE)
+        speech_segments = (vad_pool or get_vad_pool()).get_speech_timestamps(
+            torch.from_numpy(wav), sampling_rate=VAD_SAMPLING_RATE,
+            threshold=VAD_THRESHOLD, min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+            speech_pad_ms=VAD_SPEECH_PAD_MS
+        )
+    except Exception as e:
+        print(f"Erreur lors de l'estimation du bruit: {e}")
+        return 1.0
+    if not speech_segments:
+        return float(np.std(samples) / peak)
+    noise_samples = samples[~speech_mask(speech_segments, len(samples), sr)]
+    return float(np.std(noise_samples) / peak) if len(noise_samples) > 0 else 0.0
+
+def batch_metrics(matrix, lengths, sr, noise_level):
+    """
+    Calcule les métriques de qualité de N signaux en opérations NumPy vectorisées.
+    Les définitions suivent AudioProcessor (signal normalisé au pic), spectre moyen compris (audio_metrics).
+
+    - matrix : signaux complétés par des zéros, (N, L)
+    - lengths : longueur réelle de chaque signal
+    - sr : fréquence d'échantillonnage commune
+    - noise_level : niveau de bruit de chaque signal (vad_noise_level)
+    Retourne un dictionnaire de tableaux de taille N.
+    """
+    n_files, width = matrix.shape
+    valid = np.arange(width)[np.newaxis, :] < lengths[:, np.newaxis]
+    safe_len = np.maximum(lengths, 1)
+
+    abs_m = np.abs(matrix)
+    peak = abs_m.max(axis=1)
+    safe_peak = np.where(peak > 0, peak, 1)
+    gain = np.where(peak > 0, (10 ** (-NORMALIZE_HEADROOM_DB / 20)) / safe_peak, 1)
+
+    sum_sq = np.einsum("ij,ij->i", matrix, matrix, dtype=np.float64)
+    rms = (np.sqrt(sum_sq / safe_len) * gain * INT16_MAX).astype(np.int64)
+
+    saturation_count = np.count_nonzero((abs_m >= SATURATION_RATIO * peak[:, np.newaxis]) & valid, axis=1)
+    del abs_m
+
+    signs = np.signbit(matrix)
+    zero_crossings = np.count_nonzero((signs[:, 1:] != signs[:, :-1]) & valid[:, 1:], axis=1)
+    zero_crossing_rate = zero_crossings / safe_len
+    del signs
+
+    # spectre moyen de Welch (même estimateur qu'AudioProcessor) : seules les trames entièrement dans le signal
+    # comptent, un signal plus court qu'une trame en a une, complétée par des zéros (comme welch_spectrum)
+    nperseg = spectrum_nperseg(sr)
+    if width < nperseg:
+        matrix = np.pad(matrix, ((0, 0), (0, nperseg - width)))
+    frames = spectrum_frames(matrix, nperseg)
+    frame_valid = (np.arange(frames.shape[1]) * (nperseg // 2) + nperseg)[np.newaxis, :] <= lengths[:, np.newaxis]
+    frame_valid[:, 0] |= (lengths > 0) & (lengths < nperseg)
+    power = frames_power(frames, frame_valid.astype(np.float32),
+                         chunk=max(SPECTRUM_FRAMES_PER_CHUNK // max(n_files, 1), 1))
+    xf, spectrum = mean_spectrum(power, frame_valid.sum(axis=1), nperseg, sr)
+    total = spectrum.sum(axis=1)
+    safe_total = np.where(total > 0, total, 1)
+    spectral_centroid = np.where(total > 0, spectrum @ xf / safe_total, 0)
+    cumulative = np.cumsum(spectrum, axis=1)
+    rolloff_idx = np.argmax(cumulative >= ROLLOFF_RATIO * total[:, np.newaxis], axis=1)
+    spectral_rolloff = np.where(total > 0, xf[rolloff_idx], 0)
+
+    return {
+        "duration": lengths / sr,
+        "rms": rms,
+        "saturation_count": saturation_count,
+        "zero_crossing_rate": zero_crossing_rate,
+        "noise_level": np.asarray(noise_level, dtype=np.float64),
+        "spectral_centroid": spectral_centroid,
+        "spectral_rolloff": spectral_rolloff,
+    }
+
+def rejection_masks(metrics):
+    """
+    Applique les seuils d'AudioProcessor sous forme de masques booléens (un par raison de rejet).
+    """
+    centroid = metrics["spectral_centroid"]
+    return {
+        "rms_low": metrics["rms"] < MIN_RMS,
+        "rms_high": metrics["rms"] > MAX_RMS,
+        "saturation": metrics["saturation_count"] > MAX_SATURATION_FRAMES,
+        "noise": metrics["noise_level"] > MAX_NOISE_LEVEL,
+        "centroid": (centroid < MIN_SPECTRAL_CENTROID) | (centroid > MAX_SPECTRAL_CENTROID),
+    }
+
+REASON_MESSAGES = {
+    "rms_low": lambda m: f"RMS trop faible: {m['rms']}",
+    "rms_high": lambda m: f"RMS trop élevé: {m['rms']}",
+    "saturation": lambda m: f"Saturation excessive: {m['saturation_count']}",
+    "noise": lambda m: f"Bruit excessif: {m['noise_level']:.2f}",
+    "centroid": lambda m: f"Centroïde spectral hors limites: {m['spectral_centroid']:.0f}Hz",
+}
+
+def screen_buffers(buffers, sr, names=None, noise_levels=None, vad_pool=None):
+    """
+    Analyse de qualité vectorisée de N signaux déjà décodés.
+    Retourne un DataFrame : une ligne par fichier avec les métriques, la décision et les raisons du rejet.
+
+    - buffers : liste de signaux mono float32 (même fréquence d'échantillonnage)
+    - sr : fréquence d'échantillonnage
+    - names : noms des fichiers (optionnel)
+    - noise_levels : niveaux de bruit déjà estimés (vad_noise_level), calculés ici si absents
+    - vad_pool : pool VAD (pool partagé du processus si absent)
+    """
+    if not buffers:
+        return pd.DataFrame()
+    if noise_levels is None:
+        noise_levels = [vad_noise_level(b, sr, vad_pool) for b in buffers]
+    # une matrice par groupe de longueurs proches, puis résultats remis dans l'ordre des fichiers
+    buckets = length_buckets([len(b) for b in buffers])
+    parts = []
+    for bucket in buckets:
+        matrix, lengths = pad_buffers([buffers[i] for i in bucket])
+        parts.append(batch_metrics(matrix, lengths, sr, [noise_levels[i] for i in bucket]))
+        del matrix
+    inverse = np.argsort(np.concatenate(buckets))
+    metrics = {key: np.concatenate([part[key] for part in parts])[inverse] for key in parts[0]}
+    masks = rejection_masks(metrics)
+
+    table = pd.DataFrame(metrics)
+    table.insert(0, "file", names if names is not None else range(len(buffers)))
+    table["rejected"] = np.logical_or.reduce(list(masks.values()))
+
+    reasons = [[] for _ in range(len(buffers))]
+    for code, mask in masks.items():
+        for i in np.flatnonzero(mask):
+            reasons[i].append(REASON_MESSAGES[code](table.iloc[i]))
+    table["rejection_reasons"] = ["; ".join(r) for r in reasons]
+    return table
+
+def load_for_screening(audio_path, sr=SCREEN_SR, preprocess=True):
+    """
+    Décode un fichier en mono float32 à `sr` Hz, avec la chaîne Pedalboard d'AudioProcessor si preprocess=True.
+    """
+    with AudioFile(audio_path) as f:
+        audio = f.read(f.frames)
+        file_sr = f.samplerate
+    if preprocess:
+        audio = build_board()(audio, sample_rate=file_sr)
+    samples = np.clip(to_mono(audio), -1.0, 1.0).astype(np.float32, copy=False)
+    return resample(samples, file_sr, sr)
+
+def screen_files(audio_paths, sr=SCREEN_SR, preprocess=True, files_per_batch=FILES_PER_BATCH, num_workers=NUM_WORKERS):
+    """
+    Tri qualité d'un grand nombre de fichiers : décodage et VAD en parallèle, puis analyse vectorisée par lots.
+    """
+    tables = []
+    vad_pool = get_vad_pool(num_workers)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for i in range(0, len(audio_paths), files_per_batch):
+            paths = audio_paths[i:i + files_per_batch]
+            buffers = list(executor.map(lambda p: load_for_screening(p, sr, preprocess), paths))
+            noise_levels = list(executor.map(lambda b: vad_noise_level(b, sr, vad_pool), buffers))
+            tables.append(screen_buffers(buffers, sr, names=[os.path.basename(p) for p in paths],
+                                         noise_levels=noise_levels))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    audio_dir = sys.argv[1] if len(sys.argv) > 1 else "data/audio/hospital"
+    audio_files = sorted(
+        os.path.join(audio_dir, f) for f in os.listdir(audio_dir)
+        if f.endswith(".wav") and not f.endswith("_cleaned.wav")
+    )
+    table = screen_files(audio_files)
+    table.to_csv("audio_screening.csv", index=False)
+    print(f"{len(table)} fichiers analysés, {int(table['rejected'].sum()) if len(table) else 0} rejetés.")
+    print("Résultats enregistrés dans audio_screening.csv")
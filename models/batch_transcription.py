@@ -0,0 +1,183 @@
+import os
+import sys
+import numpy as np
+import torch
+from pedalboard.io import AudioFile
+from audio_processor import to_mono, resample, VAD_SAMPLING_RATE, VAD_THRESHOLD, VAD_MIN_SPEECH_MS, VAD_SPEECH_PAD_MS
+from vad_pool import get_vad_pool
+from transcription_backends import create_backend
+from transcript_cache import get_transcript_cache
+
+ASR_SAMPLING_RATE = 16000
+CHUNK_SEC = 30             # fenêtre de Whisper : un morceau = une entrée du lot
+BATCH_SIZE = 16
+FILES_PER_BATCH = 32       # fichiers décodés en mémoire en même temps
+
+def load_audio(audio_path, sr=ASR_SAMPLING_RATE):
+    """
+    Décode un fichier en mono float32 à `sr` Hz.
+    """
+    with AudioFile(audio_path) as f:
+        audio = f.read(f.frames)
+        file_sr = f.samplerate
+    return resample(np.clip(to_mono(audio), -1.0, 1.0).astype(np.float32, copy=False), file_sr, sr)
+
+def detect_speech(samples, vad_pool=None):
+    """
+    Timestamps de parole (en échantillons à 16 kHz) d'un signal à 16 kHz, avec les paramètres d'AudioProcessor.
+    """
+    return (vad_pool or get_vad_pool()).get_speech_timestamps(
+        torch.from_numpy(samples), sampling_rate=VAD_SAMPLING_RATE,
+        threshold=VAD_THRESHOLD, min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+        speech_pad_ms=VAD_SPEECH_PAD_MS
+    )
+
+def plan_chunks(speech_timestamps, n_samples, max_samples):
+    """
+    Regroupe les segments de parole en morceaux d'au plus max_samples échantillons, coupés
+    aux frontières du VAD ; un segment plus long que max_samples est découpé à longueur fixe.
+    Retourne une liste de (début, fin) en échantillons.
+    """
+    chunks = []
+    start = end = None
+    for seg in speech_timestamps:
+        seg_start, seg_end = max(0, seg["start"]), min(seg["end"], n_samples)
+        if seg_end <= seg_start:
+            continue
+        if start is not None and seg_end - start <= max_samples:
+            end = seg_end
+            continue
+        if start is not None:
+            chunks.append((start, end))
+        while seg_end - seg_start > max_samples:
+            chunks.append((seg_start, seg_start + max_samples))
+            seg_start += max_samples
+        start, end = seg_start, seg_end
+    if start is not None:
+        chunks.append((start, end))
+    return chunks
+
+def shift_segments(segments, offset_sec):
+    """
+    Décale les timestamps de segments (relatifs à un morceau) vers le temps absolu du fichier.
+    """
+    shifted = []
+    for seg in segments:
+        seg = dict(seg, start=seg["start"] + offset_sec, end=seg["end"] + offset_sec)
+        if seg.get("words"):
+            seg["words"] = [dict(w, start=w["start"] + offset_sec, end=w["end"] + offset_sec) for w in seg["words"]]
+        shifted.append(seg)
+    return shifted
+
+
+class BatchTranscriber:
+    """
+    Transcription de nombreux fichiers courts en lots partagés : les morceaux de parole (VAD, au plus 30 s)
+    de tous les fichiers sont regroupés dans les mêmes lots d'inférence, puis les segments sont
+    replacés dans la transcription de leur fichier, avec des timestamps absolus.
+    Les backends sans inférence par lots (voir TranscriptionBackend.transcribe_chunks) traitent les morceaux un par un.
+
+    - backend : transcription_backends.TranscriptionBackend (le plus rapide disponible si absent)
+    - batch_size : nombre de morceaux par lot
+    - chunk_sec : durée maximale d'un morceau
+    - vad_pool : pool VAD (pool partagé du processus si absent)
+    - cache : transcript_cache.TranscriptCache (cache partagé du processus si absent)
+    """
+    def __init__(self, backend=None, batch_size=BATCH_SIZE, chunk_sec=CHUNK_SEC, vad_pool=None, cache=None):
+        self.backend = backend or create_backend()
+        self.batch_size = batch_size
+        self.chunk_sec = chunk_sec
+        self.chunk_samples = int(chunk_sec * ASR_SAMPLING_RATE)
+        self.vad_pool = vad_pool
+        self.cache = cache or get_transcript_cache()
+
+    def transcribe_buffers(self, buffers, speech_timestamps=None):
+        """
+        Transcrit des signaux déjà décodés (mono float32, 16 kHz).
+
+        - buffers : liste de signaux
+        - speech_timestamps : timestamps VAD de chaque signal (en échantillons à 16 kHz), détectés si absents
+        Retourne une liste de {"segments": [...], "language": ...}, dans l'ordre des signaux.
+        """
+        pieces, owners = [], []
+        for i, samples in enumerate(buffers):
+            timestamps = speech_timestamps[i] if speech_timestamps is not None else None
+            if timestamps is None:
+                timestamps = detect_speech(samples, self.vad_pool)
+            for start, end in plan_chunks(timestamps, len(samples), self.chunk_samples):
+                pieces.append(samples[start:end])
+                owners.append((i, start / ASR_SAMPLING_RATE))
+
+        results = [{"segments": [], "language": self.backend.language} for _ in buffers]
+        if not pieces:
+            return results
+        outputs = self.backend.transcribe_chunks(pieces, batch_size=self.batch_size)
+        for (i, offset_sec), output in zip(owners, outputs):
+            results[i]["segments"].extend(shift_segments(output["segments"], offset_sec))
+            results[i]["language"] = output.get("language") or results[i]["language"]
+        return results
+
+    def transcribe_files(self, audio_paths, speech_timestamps=None, files_per_batch=FILES_PER_BATCH, errors=None):
+        """
+        Transcrit une liste de fichiers par groupes de files_per_batch ; les fichiers déjà
+        dans le cache de transcriptions ne sont pas décodés. Un groupe en échec (fichier illisible,
+        erreur de décodage) est repris fichier par fichier : un seul fichier défectueux n'arrête pas les autres.
+        Retourne un dictionnaire {chemin : {"segments": [...], "language": ...}}, None pour un fichier en échec.
+
+        - errors : dictionnaire complété par {chemin : erreur} pour les fichiers en échec (optionnel)
+        """
+        if speech_timestamps is None:
+            speech_timestamps = [None] * len(audio_paths)
+        results = dict.fromkeys(audio_paths)
+        todo = []
+        # morceaux VAD transcrits séparément : clé de cache distincte de celle d'une transcription d'un seul tenant
+        config = dict(self.backend.config(), chunking={"mode": "batch", "chunk_sec": self.chunk_sec})
+        for path, timestamps in zip(audio_paths, speech_timestamps):
+            cached = self.cache.get(path, config) if self.cache is not None else None
+            if cached is not None:
+                results[path] = cached
+            else:
+                todo.append((path, timestamps))
+
+        for i in range(0, len(todo), files_per_batch):
+            group = todo[i:i + files_per_batch]
+            try:
+                self._transcribe_group(group, results, config)
+            except Exception as e:
+                if len(group) == 1:
+                    self._record_failure(group[0][0], e, errors)
+                    continue
+                print(f"Échec du lot de {len(group)} fichiers ({e}) : reprise fichier par fichier")
+                for item in group:
+                    try:
+                        self._transcribe_group([item], results, config)
+                    except Exception as error:
+                        self._record_failure(item[0], error, errors)
+        return results
+
+    def _transcribe_group(self, group, results, config):
+        buffers = [load_audio(path) for path, _ in group]
+        outputs = self.transcribe_buffers(buffers, [timestamps for _, timestamps in group])
+        for (path, _), result in zip(group, outputs):
+            results[path] = result
+            if self.cache is not None:
+                self.cache.put(path, config, result)
+
+    def _record_failure(self, path, error, errors):
+        print(f"Erreur lors de la transcription de ({path}) : {error}")
+        if errors is not None:
+            errors[path] = repr(error)
+
+
+if __name__ == "__main__":
+    from transcriber import Transcriber
+
+    audio_dir = sys.argv[1] if len(sys.argv) > 1 else "data/audio/hospital"
+    audio_files = sorted(os.path.join(audio_dir, f) for f in os.listdir(audio_dir) if f.endswith("_cleaned.wav"))
+    batch = BatchTranscriber()
+    for audio_path, result in batch.transcribe_files(audio_files).items():
+        if result is None:
+            continue
+        transcriber = Transcriber(audio_path, backend=batch.backend)
+        transcriber.set_result(result)
+        transcriber.save_transcript()
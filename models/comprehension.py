@@ -2,10 +2,17 @@ import json
 import re
 import os
 from pathlib import Path
-from llama_cpp import Llama 
+from transcript_format import TranscriptReader
+from llm_labeller import LlamaLabeller, build_prompt
+from labelled_dataset import LabelledDataset
+from labelling_scheduler import LabellingScheduler, LABEL_WORKERS
 
 MODEL_PATH = "models/mistral-7b-instruct-v0.2.Q5_K_M.gguf"  
 USE_MISTRAL_FOR_LABELS = True  # permet de labeliser le dataset automatiquement
+# "logits" : sans génération, comparaison des log-probabilités des deux réponses complètes
+#            (label, plus une confiance si une température a été ajustée : voir llm_labeller.LlamaLabeller.calibrate)
+# "generate" : génération de quelques tokens puis comparaison de texte (réponses hors format -> "ambigue")
+LABEL_MODE = "logits"
 
 # Fonctions utilitaires
 def load_keywords(file_path):
@@ -31,6 +38,17 @@ def load_transcript(file_path):
 
     - file_path : le chemin d'accès au fichier
     """
+    # Transcript structuré s'il existe : "speaker" garde le préfixe de ligne de l'ancien format
+    # (timecode, suivi du locuteur s'il est connu) pour que les contextes restent identiques
+    if TranscriptReader.exists(file_path):
+        reader = TranscriptReader(file_path)
+        labels = reader.speaker_labels()
+        return [
+            {"speaker": f"{timecode} {label}" if label else timecode, "text": text}
+            for timecode, label, text in zip(reader.timecodes(), labels, reader.texts("text"))
+        ]
+
+    # Ancien format texte
     transcript = []
     try:
         with open(file_path, "r", encoding="utf-8") as file:
@@ -66,57 +84,80 @@ def format_context(transcript, start_idx, window=2):
     return " ".join(f"{line['speaker']} : {line['text']}" for line in transcript[start:end])
 
 
-def ask_mistral(context, keyword, model):
+def ask_mistral(context, keyword, labeller):
     """
+    Demande au modèle si le mot-clé est employé de manière affirmative ou négative dans le contexte.
+    Retourne la réponse brute du modèle, en minuscules.
+
+    - labeller : llm_labeller.LlamaLabeller (modèle chargé une fois, préfixes du prompt réutilisés)
+    """
+    return labeller.ask(context, keyword)
+
+
+def label_hits(hits, labeller):
+    """
+    Labellise les occurrences une par une dans le processus courant : (contexte, mot-clé, label, confiance).
     """
-    prompt = (
-        f"Voici un extrait de conversation contenant le mot '{keyword}':\n"
-        f"{context}\n"
-        f"Le mot '{keyword}' est-il utilisé ici de manière affirmative (positive) ou négative ?\n"
-        f"Répondez strictement par 'affirmative' ou 'négative'. Un seul mot. Aucune explication.\n"
-        f"Réponse :"
-    )
-    result = model(prompt, max_tokens=5)
-    return result["choices"][0]["text"].strip().lower()
-
-
-def generate_dataset(transcript_path, keywords_path, output_jsonl):
+    for context, kw in hits:
+        if USE_MISTRAL_FOR_LABELS:
+            label, confidence = labeller.label(context, kw, LABEL_MODE)
+        else:
+            label, confidence = "TODO", None
+        yield context, kw, label, confidence
+
+
+def generate_dataset(transcript_path, keywords_path, output_jsonl, labeller=None, dataset=None, scheduler=None):
     """
+    Cette fonction repère les mots-clés d'une transcription et écrit un exemple (contexte, mot-clé, label)
+    par occurrence dans output_jsonl. Les paires (contexte, mot-clé) déjà présentes dans le dataset
+    ne sont pas relabellisées : relancer le script ne coûte que les nouvelles occurrences.
+
+    - labeller : llm_labeller.LlamaLabeller partagé entre les fichiers (créé si absent)
+    - dataset : labelled_dataset.LabelledDataset ouvert sur output_jsonl (ouvert pour ce fichier si absent)
+    - scheduler : labelling_scheduler.LabellingScheduler (labellisation sur plusieurs processus) ;
+      sans scheduler, labellisation dans le processus courant avec labeller
     """
+    if dataset is None:
+        with LabelledDataset(output_jsonl) as dataset:
+            return generate_dataset(transcript_path, keywords_path, output_jsonl, labeller, dataset, scheduler)
+
     transcript = load_transcript(transcript_path)
     keywords = load_keywords(keywords_path)
-    dataset = []
-
-    model = None
-    if USE_MISTRAL_FOR_LABELS:
-        model = Llama(model_path=MODEL_PATH, verbose=False, n_ctx=32768)
+    written, skipped = dataset.written, dataset.skipped
 
+    # occurrences d'abord : les mots-clés d'une même ligne se suivent et partagent le même contexte
+    hits = []
     for i, line in enumerate(transcript):
+        context = None
         for entry in keywords:
-            matched = get_keywords_in_text(line["text"], entry)
-            for kw in matched:
-                context = format_context(transcript, i)
-                label = None
-                if USE_MISTRAL_FOR_LABELS:
-                    answer = ask_mistral(context, kw, model)
-                    if answer in ["affirmative", "négative", "affirmative.", "négative."]:
-                        label = answer
-                    else:
-                        label = "ambigue"
-                else:
-                    label = "TODO"
-
-                dataset.append({
-                    "context": context,
-                    "keyword": kw,
-                    "label": label
-                })
-
-    with open(output_jsonl, "a", encoding="utf-8") as f:
-        for example in dataset:
-            f.write(json.dumps(example, ensure_ascii=False) + "\n")
-
-    print(f"{len(dataset)} exemples écrits dans {output_jsonl}")
+            for kw in get_keywords_in_text(line["text"], entry):
+                context = context or format_context(transcript, i)
+                hits.append((context, kw))
+    hits = dataset.pending(hits)
+
+    if scheduler is not None and USE_MISTRAL_FOR_LABELS:
+        # chaque processus dimensionne son propre n_ctx ; résultats rendus dans l'ordre des occurrences
+        results = scheduler.label(hits)
+    else:
+        if USE_MISTRAL_FOR_LABELS and hits:
+            labeller = labeller or LlamaLabeller(MODEL_PATH)
+            # n_ctx dimensionné sur les prompts de ce fichier (le modèle n'est rechargé que s'il doit grandir)
+            labeller.reserve([build_prompt(context, kw) for context, kw in hits])
+        results = label_hits(hits, labeller)
+
+    for context, kw, label, confidence in results:
+        example = {
+            "context": context,
+            "keyword": kw,
+            "label": label
+        }
+        if confidence is not None:
+            example["confidence"] = round(confidence, 4)
+        # écrit tout de suite : un arrêt en cours de fichier ne perd que les exemples en cours
+        dataset.write(example)
+
+    print(f"{dataset.written - written} exemples écrits dans {output_jsonl} "
+          f"({dataset.skipped - skipped} déjà labellisés)")
 
 
 # main
@@ -124,7 +165,17 @@ if __name__ == "__main__":
     transcript_dir = "data/transcript"
     keyword_path = "data/sca_non_sca_words.json"
     output_path = "training_data.jsonl"
-    for file_name in os.listdir(transcript_dir):
-        if file_name.lower().endswith(".txt"):
-            transcript_path = os.path.join(transcript_dir, file_name)
-            generate_dataset(transcript_path=transcript_path, keywords_path=keyword_path, output_jsonl=output_path)
+    labeller = LlamaLabeller(MODEL_PATH) if USE_MISTRAL_FOR_LABELS and LABEL_WORKERS <= 1 else None
+    scheduler = (LabellingScheduler(MODEL_PATH, workers=LABEL_WORKERS, mode=LABEL_MODE)
+                 if USE_MISTRAL_FOR_LABELS and LABEL_WORKERS > 1 else None)
+    try:
+        with LabelledDataset(output_path) as dataset:
+            for file_name in sorted(os.listdir(transcript_dir)):
+                if file_name.lower().endswith(".txt"):
+                    transcript_path = os.path.join(transcript_dir, file_name)
+                    generate_dataset(transcript_path=transcript_path, keywords_path=keyword_path,
+                                     output_jsonl=output_path, labeller=labeller, dataset=dataset,
+                                     scheduler=scheduler)
+    finally:
+        if scheduler is not None:
+            scheduler.close()
@@ -0,0 +1,129 @@
+from batch_transcription import detect_speech
+
+ASR_SAMPLING_RATE = 16000
+GATE_WINDOW_SEC = 30          # décision prise sur les premières secondes décodées
+GATE_MIN_AVG_LOGPROB = -1.2   # même seuil que le rejet après transcription complète
+GATE_MIN_CHARS = 10           # moins de 10 caractères dans la fenêtre : transcription quasi vide
+GATE_MIN_SPEECH_SEC = 1.0     # moins d'1 s de parole (VAD) dans tout l'audio : rejeté sans être décodé
+
+
+class ConfidenceGate:
+    """
+    Estimation de la confiance au fil des segments : dès que les window_sec premières secondes sont décodées,
+    la transcription est arrêtée si elles sont nettement sous le seuil de confiance (avg_logprob moyen)
+    ou presque vides. La décision n'est prise qu'une fois, sur cette fenêtre initiale ; si le décodage se termine
+    sans l'avoir atteinte (aucun segment), elle est prise sur la durée de l'audio (voir finish).
+    Un audio sans parole (VAD, voir probe) est rejeté avant tout décodage ; le VAD ne sert qu'à cette sonde,
+    le décodage des audios acceptés garde ses paramètres habituels.
+
+    - window_sec : durée décodée avant la décision
+    - min_avg_logprob : avg_logprob moyen minimal
+    - min_chars : nombre minimal de caractères transcrits dans la fenêtre
+    - min_speech_sec : durée de parole minimale détectée par le VAD dans tout l'audio
+    """
+    def __init__(self, window_sec=GATE_WINDOW_SEC, min_avg_logprob=GATE_MIN_AVG_LOGPROB, min_chars=GATE_MIN_CHARS,
+                 min_speech_sec=GATE_MIN_SPEECH_SEC):
+        self.window_sec = window_sec
+        self.min_avg_logprob = min_avg_logprob
+        self.min_chars = min_chars
+        self.min_speech_sec = min_speech_sec
+        self.logprob_sum = 0.0
+        self.n_logprobs = 0
+        self.chars = 0
+        self.decoded_sec = 0.0
+        self.decided = False
+
+    @property
+    def avg_logprob(self):
+        return self.logprob_sum / self.n_logprobs if self.n_logprobs else None
+
+    def probe(self, speech_sec, duration):
+        """
+        Sonde avant décodage : retourne la raison du rejet si l'audio (au moins window_sec secondes)
+        ne contient presque pas de parole, sinon None.
+        """
+        if self.decided or duration < self.window_sec or speech_sec >= self.min_speech_sec:
+            return None
+        self.decided = True
+        return f"transcription quasi vide ({speech_sec:.1f}s de parole sur {duration:.0f}s)"
+
+    def update(self, segment):
+        """
+        Ajoute un segment ; retourne la raison de l'arrêt si le décodage doit s'arrêter, sinon None.
+        """
+        self.decoded_sec = max(self.decoded_sec, segment["end"])
+        if segment.get("avg_logprob") is not None:
+            self.logprob_sum += segment["avg_logprob"]
+            self.n_logprobs += 1
+        self.chars += len(segment["text"].strip())
+        return self._decide()
+
+    def finish(self, duration):
+        """
+        Fin du décodage : tout l'audio (duration secondes) a été parcouru, avec ou sans segments.
+        Retourne la raison du rejet si la décision n'avait pas encore été prise, sinon None.
+        """
+        self.decoded_sec = max(self.decoded_sec, duration)
+        return self._decide()
+
+    def _decide(self):
+        if self.decided or self.decoded_sec < self.window_sec:
+            return None
+        self.decided = True
+        return self.check()
+
+    def check(self):
+        if self.chars < self.min_chars:
+            return f"transcription quasi vide ({self.chars} caractères sur {self.decoded_sec:.0f}s)"
+        avg = self.avg_logprob
+        if avg is not None and avg < self.min_avg_logprob:
+            return f"confiance trop faible ({avg:.2f} sur {self.decoded_sec:.0f}s)"
+        return None
+
+    def config(self):
+        return {"window_sec": self.window_sec, "min_avg_logprob": self.min_avg_logprob, "min_chars": self.min_chars,
+                "min_speech_sec": self.min_speech_sec}
+
+
+def gated_transcribe(backend, audio, gate=None, vad_pool=None):
+    """
+    Transcrit en consommant les segments un par un et s'arrête dès que la porte de confiance rejette l'audio.
+
+    - backend : transcription_backends.TranscriptionBackend (décodage paresseux avec faster-whisper)
+    - audio : signal mono float32 à 16 kHz
+    - gate : ConfidenceGate (paramètres par défaut si absent)
+    - vad_pool : pool VAD de la sonde (pool partagé du processus si absent)
+    Retourne {"segments", "language", "rejected", "reject_reason", "decoded_sec", "skipped_sec"}.
+    """
+    gate = gate or ConfidenceGate()
+    duration = len(audio) / ASR_SAMPLING_RATE
+    speech_sec = sum(seg["end"] - seg["start"] for seg in detect_speech(audio, vad_pool)) / ASR_SAMPLING_RATE
+    reason = gate.probe(speech_sec, duration)
+    if reason:
+        return {"segments": [], "language": backend.language, "rejected": True, "reject_reason": reason,
+                "decoded_sec": 0.0, "skipped_sec": duration}
+
+    segments_iter, language = backend.iter_segments(audio)
+    segments = []
+    try:
+        for seg in segments_iter:
+            segments.append(seg)
+            reason = gate.update(seg)
+            if reason:
+                break
+    finally:
+        # libère le modèle (registre) et arrête le décodage
+        if hasattr(segments_iter, "close"):
+            segments_iter.close()
+
+    if reason is None:
+        # aucun segment au-delà de la fenêtre (audio muet ou presque) : décision sur la durée parcourue
+        reason = gate.finish(duration)
+    return {
+        "segments": segments,
+        "language": language,
+        "rejected": reason is not None,
+        "reject_reason": reason,
+        "decoded_sec": gate.decoded_sec if reason else duration,
+        "skipped_sec": max(duration - gate.decoded_sec, 0.0) if reason else 0.0,
+    }
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+CACHE_DIR = "data/cache"
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+HASH_CHUNK_SIZE = 1 << 20
+META_FILE = "meta.json"
+
+def file_sha256(path):
+    """
+    Empreinte SHA-256 du contenu d'un fichier (lu par blocs de 1 Mo).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def config_fingerprint(config):
+    """
+    Empreinte stable d'une configuration (dictionnaire sérialisable en JSON).
+    """
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+class ContentCache:
+    """
+    Cache disque adressé par contenu : une entrée par clé (fichiers + meta.json) dans cache_dir/<clé[:2]>/<clé>/.
+    L'écriture passe par un dossier temporaire renommé, une entrée est donc complète ou absente.
+    Au-delà de max_bytes, les entrées les moins récemment utilisées sont supprimées (LRU sur la date d'accès).
+
+    - cache_dir : dossier du cache
+    - max_bytes : taille maximale du cache
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._sizes = {}
+        for entry in self._iter_entries():
+            self._sizes[entry] = _dir_size(entry)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256("\n".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _iter_entries(self):
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                if ".tmp-" in key:
+                    continue
+                entry = os.path.join(prefix_dir, key)
+                if os.path.isfile(os.path.join(entry, META_FILE)):
+                    yield entry
+
+    def get(self, key):
+        """
+        Retourne le dossier de l'entrée (et la marque comme utilisée), ou None si elle est absente.
+        """
+        entry = self._entry_path(key)
+        with self._lock:
+            if not os.path.isfile(os.path.join(entry, META_FILE)):
+                self.misses += 1
+                return None
+            now = time.time()
+            os.utime(entry, (now, now))
+            self.hits += 1
+        return entry
+
+    def load_meta(self, entry):
+        with open(os.path.join(entry, META_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key, meta, files=None):
+        """
+        Enregistre une entrée.
+
+        - key : clé de l'entrée
+        - meta : dictionnaire sérialisable en JSON
+        - files : dictionnaire {nom dans le cache : chemin du fichier à copier}
+        """
+        entry = self._entry_path(key)
+        tmp_entry = f"{entry}.tmp-{threading.get_ident()}"
+        os.makedirs(tmp_entry, exist_ok=True)
+        try:
+            for name, src in (files or {}).items():
+                # copie (pas de lien physique) : le fichier d'origine peut être réécrit plus tard
+                shutil.copyfile(src, os.path.join(tmp_entry, name))
+            with open(os.path.join(tmp_entry, META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+
+            with self._lock:
+                if os.path.exists(entry):
+                    shutil.rmtree(entry, ignore_errors=True)
+                os.replace(tmp_entry, entry)
+                self._sizes[entry] = _dir_size(entry)
+        finally:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+        return entry
+
+    def evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées tant que le cache dépasse max_bytes.
+        """
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            by_access = sorted(self._sizes, key=lambda e: os.path.getmtime(e) if os.path.exists(e) else 0)
+            for entry in by_access:
+                if total <= self.max_bytes:
+                    break
+                total -= self._sizes.pop(entry)
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._sizes),
+                "bytes": sum(self._sizes.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
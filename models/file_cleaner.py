@@ -1,19 +1,25 @@
 import os
+import shutil
+from transcript_format import TRANSCRIPT_EXT
 
 class FileCleaner:
     def __init__(self, directory):
         self.directory = directory
 
-    def remove_cleaned_files(self, extensions=[".wav", ".txt"]):
+    def remove_cleaned_files(self, extensions=[".wav", ".txt", TRANSCRIPT_EXT]):
         """
-        Supprime tous les fichiers contenant "_cleaned" dans le nom et ayant l'une des extensions spécifiées.
+        Supprime tous les fichiers contenant "_cleaned" dans le nom et ayant l'une des extensions spécifiées,
+        y compris les transcripts structurés (dossiers .transcript, lus en priorité par les étapes suivantes).
         """
         removed_files = []
         for fname in os.listdir(self.directory):
             if "_cleaned" in fname and any(fname.endswith(ext) for ext in extensions):
                 full_path = os.path.join(self.directory, fname)
                 try:
-                    os.remove(full_path)
+                    if os.path.isdir(full_path):
+                        shutil.rmtree(full_path)
+                    else:
+                        os.remove(full_path)
                     removed_files.append(fname)
                 except Exception as e:
                     print(f"Erreur lors de la suppression de {fname} : {e}")
@@ -0,0 +1,49 @@
+import re
+import json
+from content_cache import config_fingerprint
+
+KEYWORDS_PATH = "data/sca_non_sca_words.json"
+
+def load_keyword_entries(file_path=KEYWORDS_PATH):
+    """
+    Entrées de la base de mots-clés (word, synonyms, severity...), liste vide si le fichier est absent.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            return json.load(file).get("keywords", [])
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Erreur lors du chargement du fichier {file_path} : {e}")
+        return []
+
+
+class KeywordMatcher:
+    """
+    Recherche de tous les mots-clés et synonymes SCA / non SCA avec un seul motif compilé
+    (mots entiers, sans tenir compte de la casse), au lieu d'une expression par mot et par ligne.
+
+    - keywords : entrées de la base de mots-clés (chargées depuis KEYWORDS_PATH si absentes)
+    """
+    def __init__(self, keywords=None):
+        keywords = load_keyword_entries() if keywords is None else keywords
+        terms = {term for entry in keywords for term in [entry.get("word", "")] + entry.get("synonyms", []) if term}
+        # les termes les plus longs d'abord : "douleur thoracique" avant "douleur"
+        self.terms = sorted(terms, key=lambda t: (-len(t), t))
+        self.pattern = (
+            re.compile(r"\b(?:" + "|".join(re.escape(t) for t in self.terms) + r")\b", re.IGNORECASE)
+            if self.terms else None
+        )
+
+    def has_match(self, text):
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+    def find(self, text):
+        return [] if self.pattern is None else [m.group(0) for m in self.pattern.finditer(text)]
+
+    def flag_segments(self, segments):
+        """
+        Indices des segments dont le texte contient au moins un mot-clé.
+        """
+        return [i for i, seg in enumerate(segments) if self.has_match(seg["text"])]
+
+    def fingerprint(self):
+        return config_fingerprint(self.terms)
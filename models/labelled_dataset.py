@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+
+INDEX_SUFFIX = ".index"
+REPAIR_BLOCK_BYTES = 1024 ** 2   # taille des blocs lus par _repair
+# labels provisoires (à labelliser à la main, réponse hors format) : l'occurrence reste à labelliser
+UNFINISHED_LABELS = ("TODO", "ambigue", None)
+UNFINISHED_MARK = "?"            # préfixe, dans l'index, des clés d'exemples au label provisoire
+
+def example_key(context, keyword):
+    """
+    Clé d'un exemple : empreinte du contexte + mot-clé (tabulation comme séparateur dans l'index).
+    """
+    return f"{hashlib.sha256(context.encode('utf-8')).hexdigest()[:32]}\t{keyword}"
+
+def is_unfinished(label):
+    return label in UNFINISHED_LABELS
+
+
+class LabelledDataset:
+    """
+    Écriture en flux du dataset de labellisation (JSONL), avec un index sur disque des paires
+    (empreinte du contexte, mot-clé) déjà labellisées : une paire déjà présente n'est plus envoyée au modèle.
+    Chaque exemple est écrit et synchronisé sur disque dès qu'il est produit ; le fichier JSONL reste
+    la référence, l'index (une clé par ligne du JSONL) est reconstruit s'il ne lui correspond plus
+    (arrêt brutal entre les deux écritures, ancien dataset sans index).
+    Un exemple au label provisoire (voir UNFINISHED_LABELS) est écrit une seule fois mais ne compte pas comme
+    labellisé : l'occurrence est renvoyée au modèle au lancement suivant, et le label définitif est ajouté à la suite.
+
+    - output_jsonl : chemin du dataset
+    - index_path : chemin de l'index (output_jsonl + ".index" si absent)
+    """
+    def __init__(self, output_jsonl, index_path=None):
+        self.output_jsonl = output_jsonl
+        self.index_path = index_path or output_jsonl + INDEX_SUFFIX
+        self.written = 0
+        self.skipped = 0
+        n_lines = self._repair()
+        index = self._load_index(n_lines)
+        self.keys = {key for key in index if not key.startswith(UNFINISHED_MARK)}
+        self.unfinished = {key[len(UNFINISHED_MARK):] for key in index if key.startswith(UNFINISHED_MARK)}
+        self._out = open(self.output_jsonl, "a", encoding="utf-8")
+        self._index = open(self.index_path, "a", encoding="utf-8")
+
+    def _repair(self):
+        """
+        Retire une dernière ligne incomplète (arrêt pendant l'écriture) ; retourne le nombre de lignes complètes.
+        Lecture par blocs : la fin du fichier est parcourue à rebours jusqu'au dernier saut de ligne,
+        puis les lignes sont comptées sans charger le fichier en mémoire.
+        """
+        if not os.path.exists(self.output_jsonl):
+            return 0
+        with open(self.output_jsonl, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            complete = size
+            while complete > 0:
+                start = max(complete - REPAIR_BLOCK_BYTES, 0)
+                f.seek(start)
+                newline = f.read(complete - start).rfind(b"\n")
+                if newline >= 0:
+                    complete = start + newline + 1
+                    break
+                complete = start
+            if complete < size:
+                print(f"Ligne incomplète retirée de {self.output_jsonl}")
+                f.truncate(complete)
+            f.seek(0)
+            n_lines = 0
+            for block in iter(lambda: f.read(REPAIR_BLOCK_BYTES), b""):
+                n_lines += block.count(b"\n")
+        return n_lines
+
+    def _load_index(self, n_lines):
+        keys = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                keys = [line.rstrip("\n") for line in f if line.endswith("\n")]
+        if len(keys) != n_lines:
+            keys = self._rebuild_index()
+        return keys
+
+    def _rebuild_index(self):
+        print(f"Reconstruction de l'index {self.index_path}...")
+        keys = []
+        if os.path.exists(self.output_jsonl):
+            with open(self.output_jsonl, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        example = json.loads(line)
+                        key = example_key(example["context"], example["keyword"])
+                        keys.append(UNFINISHED_MARK + key if is_unfinished(example.get("label")) else key)
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        keys.append("")  # ligne illisible : garde l'alignement avec le JSONL
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(key + "\n" for key in keys)
+        os.replace(tmp_path, self.index_path)
+        return keys
+
+    def pending(self, hits):
+        """
+        Occurrences (contexte, mot-clé) sans label définitif, sans doublons, dans l'ordre.
+        """
+        todo, seen = [], set()
+        for context, keyword in hits:
+            key = example_key(context, keyword)
+            if key in self.keys or key in seen:
+                self.skipped += 1
+                continue
+            seen.add(key)
+            todo.append((context, keyword))
+        return todo
+
+    def write(self, example):
+        """
+        Ajoute un exemple au dataset puis sa clé à l'index, avec synchronisation sur disque.
+        Un label provisoire n'est écrit que si l'occurrence n'a encore aucune ligne.
+        """
+        key = example_key(example["context"], example["keyword"])
+        unfinished = is_unfinished(example.get("label"))
+        if key in self.keys or (unfinished and key in self.unfinished):
+            self.skipped += 1
+            return False
+        self._out.write(json.dumps(example, ensure_ascii=False) + "\n")
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._index.write((UNFINISHED_MARK + key if unfinished else key) + "\n")
+        self._index.flush()
+        (self.unfinished if unfinished else self.keys).add(key)
+        self.written += 1
+        return True
+
+    def close(self):
+        self._out.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+import multiprocessing as mp
+from itertools import count, groupby
+from llm_labeller import LlamaLabeller, LLM_MODEL_PATH, LLM_CACHE_BYTES, build_prompt
+
+LABEL_WORKERS = 4            # processus llama.cpp en parallèle (1 : labellisation dans le processus courant)
+LABEL_QUEUE_SIZE = 64        # tâches en attente au plus (mémoire bornée quel que soit le nombre d'occurrences)
+LABEL_POLL_SEC = 5           # attente d'un résultat avant de vérifier que les processus sont toujours en vie
+
+def _worker(model_path, n_threads, cache_bytes, mode, jobs, results):
+    """
+    Processus de labellisation : un modèle llama.cpp avec n_threads threads et un cache d'états KV de cache_bytes.
+    Le fichier GGUF est lu en mmap, les poids sont donc partagés entre les processus par le cache de pages du système.
+    """
+    labeller = LlamaLabeller(model_path, n_threads=n_threads, cache_bytes=cache_bytes)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        call_id, seq, context, keywords = job
+        try:
+            labeller.reserve([build_prompt(context, kw) for kw in keywords])
+            results.put((call_id, seq, [labeller.label(context, kw, mode) for kw in keywords], None))
+        except Exception as e:
+            results.put((call_id, seq, None, repr(e)))
+
+
+class LabellingScheduler:
+    """
+    Labellisation en parallèle par plusieurs processus llama.cpp, chacun avec son budget de threads.
+    Les occurrences d'un même contexte forment une seule tâche, traitée par un seul processus
+    (le préfixe consigne + extrait n'est calculé qu'une fois). Les tâches passent par une file bornée
+    et les résultats sont réécrits dans l'ordre des occurrences. Chaque appel à label a son identifiant :
+    les résultats d'un appel interrompu (erreur, générateur abandonné) encore en cours sont ignorés.
+
+    - model_path : chemin du fichier GGUF
+    - workers : nombre de processus
+    - threads_per_worker : threads llama.cpp par processus (cœurs / workers si absent)
+    - cache_bytes : budget total des caches d'états KV, réparti entre les processus (cache_bytes // workers chacun)
+    - mode : "logits" ou "generate", voir LlamaLabeller.label
+    - queue_size : nombre maximal de tâches en attente
+
+    Mémoire : poids du modèle une fois (mmap partagé) + par processus un contexte KV (n_ctx) et cache_bytes // workers.
+    """
+    def __init__(self, model_path=LLM_MODEL_PATH, workers=LABEL_WORKERS, threads_per_worker=None,
+                 cache_bytes=LLM_CACHE_BYTES, mode="logits", queue_size=LABEL_QUEUE_SIZE):
+        # les processus se partagent les cœurs : pas de surcharge quel que soit le nombre de workers
+        threads_per_worker = threads_per_worker or max((os.cpu_count() or 1) // workers, 1)
+        # spawn : pas de fork d'un processus qui a déjà des threads (llama.cpp, torch)
+        ctx = mp.get_context("spawn")
+        self.jobs = ctx.Queue(maxsize=queue_size)
+        self.results = ctx.Queue()
+        self.processes = [
+            ctx.Process(target=_worker,
+                        args=(model_path, threads_per_worker, cache_bytes // workers, mode, self.jobs, self.results),
+                        daemon=True)
+            for _ in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self._call_ids = count()
+
+    def _feed(self, call_id, groups, stop):
+        for seq, context, keywords in groups:
+            while not stop.is_set():
+                try:
+                    self.jobs.put((call_id, seq, context, keywords), timeout=LABEL_POLL_SEC)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+
+    def label(self, hits):
+        """
+        Labellise des occurrences (contexte, mot-clé) ; générateur de (contexte, mot-clé, label, confiance),
+        dans l'ordre des occurrences, au fur et à mesure que les tâches se terminent.
+        """
+        groups = [
+            (seq, context, [kw for _, kw in group])
+            for seq, (context, group) in enumerate(groupby(hits, key=lambda hit: hit[0]))
+        ]
+        call_id = next(self._call_ids)
+        stop = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(call_id, groups, stop), daemon=True)
+        feeder.start()
+
+        try:
+            done = {}
+            next_seq = 0
+            while next_seq < len(groups):
+                while next_seq not in done:
+                    try:
+                        result_call_id, seq, labels, error = self.results.get(timeout=LABEL_POLL_SEC)
+                    except queue.Empty:
+                        # un processus tué (mémoire, signal) ne renverra jamais ses résultats
+                        self._check_workers()
+                        continue
+                    if result_call_id != call_id:
+                        continue  # résultat d'un appel précédent interrompu
+                    if error is not None:
+                        raise RuntimeError(f"Échec de la labellisation : {error}")
+                    done[seq] = labels
+                _, context, keywords = groups[next_seq]
+                for kw, (label, confidence) in zip(keywords, done.pop(next_seq)):
+                    yield context, kw, label, confidence
+                next_seq += 1
+        finally:
+            # erreur ou générateur abandonné : plus aucune tâche n'est ajoutée pour cet appel
+            stop.set()
+            feeder.join()
+
+    def _check_workers(self):
+        dead = [process.exitcode for process in self.processes if not process.is_alive()]
+        if dead:
+            raise RuntimeError(f"Processus de labellisation arrêté (codes de sortie : {dead})")
+
+    def close(self):
+        # après une erreur, la file peut rester pleine (tâches abandonnées, processus arrêté) : attente bornée
+        for process in self.processes:
+            if process.is_alive():
+                try:
+                    self.jobs.put(None, timeout=LABEL_POLL_SEC)
+                except queue.Full:
+                    break
+        for process in self.processes:
+            process.join(LABEL_POLL_SEC)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,305 @@
+import json
+import math
+import sys
+import numpy as np
+from model_registry import get_model_registry
+
+LLM_MODEL_PATH = "models/mistral-7b-instruct-v0.2.Q5_K_M.gguf"
+LLM_MIN_N_CTX = 512
+LLM_MAX_N_CTX = 32768
+LLM_ANSWER_TOKENS = 5
+LLM_THREADS = 0                      # 0 : valeur par défaut de llama.cpp
+LLM_CACHE_BYTES = 2 * 1024 ** 3      # états KV gardés en RAM (LlamaRAMCache)
+
+# Classification par logits : comparaison des log-probabilités de chaque réponse complète (somme sur ses tokens)
+# après le prompt. Les labels restent ceux lus par training.py.
+LABEL_CONTINUATIONS = {"affirmative.": " affirmative", "négative.": " négative"}
+# température ajustée sur des exemples vérifiés (voir calibrate), rangée à côté du modèle ;
+# sans ce fichier la confiance n'est pas calibrée et n'est pas retournée
+LABEL_CALIBRATION_SUFFIX = ".calibration.json"
+LABEL_SCORING = "sequence"           # méthode de score : une calibration d'une autre méthode est ignorée
+ANSWER_PREFIX = "Réponse :"
+# deux prompts aux réponses opposées : des écarts identiques signalent des logits mal lus (voir check_logits)
+CHECK_PROMPTS = (
+    ("Oui, je suis tout à fait d'accord avec ce traitement.", "accord"),
+    ("Non, je refuse absolument ce traitement.", "refuse"),
+)
+
+# Le prompt commence par la consigne (identique pour tous les appels), puis l'extrait (identique pour
+# tous les mots-clés d'une même ligne), et se termine par le mot-clé : llama.cpp réutilise le cache KV
+# du plus long préfixe commun et ne calcule que la fin du prompt.
+PROMPT_INSTRUCTION = (
+    "On vous donne un extrait de conversation, puis un mot présent dans cet extrait.\n"
+    "Indiquez si ce mot est utilisé de manière affirmative (positive) ou négative.\n"
+    "Répondez strictement par 'affirmative' ou 'négative'. Un seul mot. Aucune explication.\n\n"
+)
+
+def build_prompt(context, keyword):
+    return (
+        f"{PROMPT_INSTRUCTION}"
+        f"Extrait de conversation :\n{context}\n\n"
+        f"Le mot '{keyword}' est-il utilisé ici de manière affirmative (positive) ou négative ?\n"
+        f"Réponse :"
+    )
+
+def fit_n_ctx(n_tokens, min_n_ctx=LLM_MIN_N_CTX, max_n_ctx=LLM_MAX_N_CTX):
+    """
+    Taille de contexte pour n_tokens : puissance de deux suivante, bornée par [min_n_ctx, max_n_ctx].
+    """
+    n_ctx = min_n_ctx
+    while n_ctx < n_tokens and n_ctx < max_n_ctx:
+        n_ctx *= 2
+    return min(n_ctx, max_n_ctx)
+
+
+def label_probability(margin, temperature):
+    """
+    Probabilité du label "affirmative." à partir de l'écart de log-probabilités (affirmative - négative).
+    """
+    return 1.0 / (1.0 + math.exp(-margin / temperature))
+
+def fit_temperature(margins, labels, candidates=None):
+    """
+    Température qui minimise la log-vraisemblance négative sur des exemples vérifiés à la main.
+
+    - margins : écarts de log-probabilités retournés par LlamaLabeller.score
+    - labels : 1 pour affirmative, 0 pour négative
+    """
+    candidates = candidates or [0.25 * k for k in range(1, 41)]
+    def nll(temperature):
+        total = 0.0
+        for margin, label in zip(margins, labels):
+            p = min(max(label_probability(margin, temperature), 1e-12), 1 - 1e-12)
+            total -= math.log(p) if label else math.log(1 - p)
+        return total
+    return min(candidates, key=nll)
+
+def load_temperature(path):
+    """
+    Température enregistrée par save_temperature, ou None si le fichier est absent
+    ou a été ajusté pour une autre méthode de score.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            calibration = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if calibration.get("scoring") != LABEL_SCORING:
+        return None
+    return calibration.get("temperature")
+
+def save_temperature(path, temperature, n_examples):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"scoring": LABEL_SCORING, "temperature": temperature, "n_examples": n_examples}, f)
+
+
+class LlamaLabeller:
+    """
+    Labellisation par un modèle GGUF (llama.cpp) chargé une seule fois par processus (registre de modèles).
+    n_ctx est dimensionné sur les prompts réellement envoyés (voir reserve) au lieu d'un contexte fixe de 32k,
+    et les états KV des préfixes déjà calculés (consigne, extrait) sont gardés en RAM et réutilisés.
+
+    - model_path : chemin du fichier GGUF
+    - n_threads : threads llama.cpp (0 : valeur par défaut)
+    - cache_bytes : taille maximale du cache d'états KV (0 : pas de cache)
+    - registry : registre de modèles (registre partagé du processus si absent)
+    - calibration_path : température ajustée (voir calibrate), à côté du modèle si absent
+    """
+    def __init__(self, model_path=LLM_MODEL_PATH, n_threads=LLM_THREADS, cache_bytes=LLM_CACHE_BYTES,
+                 device="cpu", registry=None, calibration_path=None):
+        self.model_path = model_path
+        self.calibration_path = calibration_path or model_path + LABEL_CALIBRATION_SUFFIX
+        self.temperature = load_temperature(self.calibration_path)
+        self.n_threads = n_threads
+        self.cache_bytes = cache_bytes
+        self.device = device
+        self.registry = registry or get_model_registry()
+        self.n_ctx = 0
+        self._tokenizer = None
+        self._answer_tokens = None
+        self._logits_checked = False
+
+    def tokenize(self, text, add_bos=True):
+        if self._tokenizer is None:
+            # vocabulaire seul : tokenisation sans charger les poids
+            from llama_cpp import Llama
+            self._tokenizer = Llama(model_path=self.model_path, vocab_only=True, verbose=False)
+        return self._tokenizer.tokenize(text.encode("utf-8"), add_bos=add_bos)
+
+    def count_tokens(self, text):
+        return len(self.tokenize(text))
+
+    def reserve(self, prompts, answer_tokens=LLM_ANSWER_TOKENS):
+        """
+        Agrandit n_ctx si l'un des prompts (plus la réponse) n'y tient pas ; le modèle n'est rechargé que dans ce cas.
+        """
+        longest = max((self.count_tokens(p) for p in prompts), default=0)
+        n_ctx = fit_n_ctx(longest + answer_tokens)
+        if n_ctx > self.n_ctx:
+            if self.n_ctx:
+                self.registry.discard("llama-cpp", self.model_path, self.device, **self.model_options())
+            self.n_ctx = n_ctx
+        return self.n_ctx
+
+    def model_options(self):
+        options = {"n_ctx": self.n_ctx or LLM_MIN_N_CTX}
+        if self.n_threads:
+            options["n_threads"] = self.n_threads
+        return options
+
+    def model(self):
+        model = self.registry.get("llama-cpp", self.model_path, self.device, **self.model_options())
+        if self.cache_bytes and model.cache is None:
+            from llama_cpp import LlamaRAMCache
+            model.set_cache(LlamaRAMCache(capacity_bytes=self.cache_bytes))
+        return model
+
+    def complete(self, prompt, max_tokens=LLM_ANSWER_TOKENS):
+        result = self.model()(prompt, max_tokens=max_tokens)
+        return result["choices"][0]["text"]
+
+    def answer_tokens(self):
+        """
+        Tokens de chaque réponse, tels qu'ils suivent "Réponse :" dans le prompt.
+        """
+        if self._answer_tokens is None:
+            prefix = self.tokenize(ANSWER_PREFIX)
+            tokens = {}
+            for label, continuation in LABEL_CONTINUATIONS.items():
+                full = self.tokenize(ANSWER_PREFIX + continuation)
+                if full[:len(prefix)] != prefix:
+                    raise ValueError(f"Réponse fusionnée avec le prompt à la tokenisation : {continuation!r}")
+                tokens[label] = full[len(prefix):]
+            if len({tuple(t) for t in tokens.values()}) != len(tokens):
+                raise ValueError(f"Réponses indiscernables : {tokens}")
+            self._answer_tokens = tokens
+        return self._answer_tokens
+
+    def continuation_logprobs(self, prompt, continuations):
+        """
+        Log-probabilité de chaque continuation (liste de tokens) après le prompt : somme des log-probabilités
+        de ses tokens. Un passage par token de réponse, les positions communes aux continuations ne sont
+        calculées qu'une fois ; le prompt profite du cache KV (voir _logprobs_after).
+        """
+        model = self.model()
+        tokens = model.tokenize(prompt.encode("utf-8"), add_bos=True)
+        computed = {}
+        totals = []
+        for continuation in continuations:
+            total = 0.0
+            for i, token in enumerate(continuation):
+                key = tuple(continuation[:i])
+                if key not in computed:
+                    # seul l'état du prompt seul est gardé dans le cache d'états
+                    computed[key] = self._logprobs_after(model, tokens + list(key), save_state=not key)
+                total += computed[key][token]
+            totals.append(float(total))
+        return totals
+
+    def _logprobs_after(self, model, tokens, save_state=False):
+        """
+        Log-probabilités du token suivant (vocabulaire entier) après tokens, en un passage sans génération.
+        Le cache KV du plus long préfixe commun est réutilisé, en mémoire ou dans le cache d'états.
+        """
+        import llama_cpp
+        from llama_cpp import Llama
+        if model.cache is not None:
+            try:
+                state = model.cache[tokens]
+                if (Llama.longest_token_prefix(state.input_ids.tolist(), tokens)
+                        > Llama.longest_token_prefix(model._input_ids.tolist(), tokens)):
+                    model.load_state(state)
+            except KeyError:
+                pass
+        # generate() évalue le prompt (en reprenant le préfixe déjà calculé, au moins le dernier token)
+        # avant de produire le premier token, qui n'est pas encore évalué à ce moment-là
+        generator = model.generate(tokens, temp=0.0)
+        next(generator)
+        generator.close()
+        # sans logits_all, model.scores n'est pas rempli : logits du dernier token lus dans le contexte llama.cpp
+        logits = np.ctypeslib.as_array(
+            llama_cpp.llama_get_logits_ith(model.ctx, -1), shape=(model.n_vocab(),)
+        ).astype(np.float64)
+        if save_state and model.cache is not None:
+            model.cache[tokens] = model.save_state()
+
+        top = logits.max()
+        return logits - (top + np.log(np.exp(logits - top).sum()))
+
+    def check_logits(self):
+        """
+        Vérification faite une fois par processus : deux prompts différents doivent donner des écarts différents,
+        sinon les logits lus ne correspondent pas au prompt (version de llama-cpp-python incompatible).
+        """
+        if self._logits_checked:
+            return
+        margins = [self.margin(context, keyword, check=False) for context, keyword in CHECK_PROMPTS]
+        if abs(margins[0] - margins[1]) < 1e-6:
+            raise RuntimeError(f"Logits indépendants du prompt (écarts {margins}) : lecture des logits invalide")
+        self._logits_checked = True
+
+    def margin(self, context, keyword, check=True):
+        """
+        Écart de log-probabilités des deux réponses complètes (affirmative - négative).
+        """
+        if check:
+            self.check_logits()
+        answer_tokens = self.answer_tokens()
+        affirmative, negative = self.continuation_logprobs(
+            build_prompt(context, keyword), [answer_tokens["affirmative."], answer_tokens["négative."]]
+        )
+        return affirmative - negative
+
+    def score(self, context, keyword, temperature=None):
+        """
+        Classification sans génération : retourne (label, confiance, écart de log-probabilités).
+        La confiance est la probabilité calibrée (température) du label retenu, entre 0.5 et 1 ;
+        None sans température ajustée (voir calibrate) : un écart brut n'est pas une probabilité.
+        """
+        margin = self.margin(context, keyword)
+        label = "affirmative." if margin >= 0 else "négative."
+        temperature = temperature or self.temperature
+        if temperature is None:
+            return label, None, margin
+        p = label_probability(margin, temperature)
+        return label, max(p, 1 - p), margin
+
+    def calibrate(self, examples):
+        """
+        Ajuste la température sur des exemples vérifiés à la main et l'enregistre dans calibration_path.
+
+        - examples : liste de (contexte, mot-clé, label), label "affirmative." ou "négative."
+        """
+        margins = [self.margin(context, keyword) for context, keyword, _ in examples]
+        labels = [1 if label.lower().startswith("affirmative") else 0 for _, _, label in examples]
+        self.temperature = fit_temperature(margins, labels)
+        save_temperature(self.calibration_path, self.temperature, len(examples))
+        return self.temperature
+
+    def label(self, context, keyword, mode="logits"):
+        """
+        Label d'une occurrence : (label, confiance). En mode "generate", la réponse générée est comparée
+        aux labels attendus (hors format : "ambigue", sans confiance). Confiance None sans calibration.
+        """
+        if mode == "logits":
+            label, confidence, _ = self.score(context, keyword)
+            return label, confidence
+        answer = self.ask(context, keyword)
+        return (answer if answer in ["affirmative", "négative", "affirmative.", "négative."] else "ambigue"), None
+
+    def ask(self, context, keyword):
+        """
+        Réponse du modèle (en minuscules) à la question affirmative / négative pour ce mot-clé.
+        """
+        return self.complete(build_prompt(context, keyword)).strip().lower()
+
+
+if __name__ == "__main__":
+    # calibration : python llm_labeller.py exemples_verifies.jsonl (lignes {"context", "keyword", "label"})
+    verified_path = sys.argv[1] if len(sys.argv) > 1 else "verified_labels.jsonl"
+    with open(verified_path, "r", encoding="utf-8") as f:
+        verified = [json.loads(line) for line in f if line.strip()]
+    labeller = LlamaLabeller()
+    labeller.reserve([build_prompt(ex["context"], ex["keyword"]) for ex in verified])
+    temperature = labeller.calibrate([(ex["context"], ex["keyword"], ex["label"]) for ex in verified])
+    print(f"Température {temperature} ajustée sur {len(verified)} exemples : {labeller.calibration_path}")
@@ -0,0 +1,111 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from batch_transcription import ASR_SAMPLING_RATE, load_audio, detect_speech, plan_chunks, shift_segments
+from transcription_backends import create_backend
+
+LONG_AUDIO_MIN_SEC = 600    # en dessous, une seule passe séquentielle
+LONG_CHUNK_SEC = 120
+LONG_OVERLAP_SEC = 2
+NUM_WORKERS = 4
+
+def overlapping_chunks(chunks, overlap_samples):
+    """
+    Étend chaque morceau (sauf le premier) de overlap_samples vers l'arrière.
+    Retourne des (début étendu, début propre, fin) : le morceau « possède » l'intervalle [début propre, fin).
+    """
+    return [(max(start - overlap_samples, 0) if i > 0 else start, start, end) for i, (start, end) in enumerate(chunks)]
+
+def stitch_segments(chunk_results, owned_bounds):
+    """
+    Recolle les segments des morceaux (timestamps déjà absolus) : un segment n'est gardé que par le morceau
+    qui possède son milieu, ce qui supprime les doublons des zones de recouvrement.
+
+    - chunk_results : listes de segments, une par morceau, dans l'ordre
+    - owned_bounds : (début, fin) possédés par chaque morceau, en secondes
+    """
+    segments = []
+    for i, (chunk_segments, (own_start, own_end)) in enumerate(zip(chunk_results, owned_bounds)):
+        last = i == len(owned_bounds) - 1
+        for seg in chunk_segments:
+            middle = (seg["start"] + seg["end"]) / 2
+            if middle >= own_start and (middle < own_end or last):
+                segments.append(seg)
+    segments.sort(key=lambda seg: seg["start"])
+    return segments
+
+
+class LongAudioTranscriber:
+    """
+    Transcription parallèle des enregistrements longs : l'audio est coupé aux frontières du VAD en morceaux
+    d'au plus chunk_sec secondes, avec un recouvrement de overlap_sec secondes, transcrits en parallèle
+    par un pool de workers puis recollés avec des timestamps absolus et sans doublons.
+
+    - backend : transcription_backends.TranscriptionBackend, créé pour workers transcriptions simultanées si absent.
+      Le modèle déjà chargé dans le registre est réutilisé tel quel : au plus backend.concurrency morceaux
+      sont transcrits en même temps (un par un pour les backends non réentrants)
+    - workers : nombre maximal de morceaux transcrits en même temps
+    - chunk_sec : durée maximale d'un morceau
+    - overlap_sec : recouvrement entre deux morceaux consécutifs
+    """
+    def __init__(self, backend=None, workers=NUM_WORKERS, chunk_sec=LONG_CHUNK_SEC, overlap_sec=LONG_OVERLAP_SEC,
+                 vad_pool=None):
+        self.backend = backend or create_backend(workers=workers)
+        # au-delà, les appels attendraient de toute façon une place sur le modèle (registre)
+        self.workers = max(min(workers, self.backend.concurrency), 1)
+        self.chunk_sec = chunk_sec
+        self.overlap_sec = overlap_sec
+        self.chunk_samples = int(chunk_sec * ASR_SAMPLING_RATE)
+        self.overlap_samples = int(overlap_sec * ASR_SAMPLING_RATE)
+        self.vad_pool = vad_pool
+
+    def config(self):
+        """
+        Découpage en morceaux (pour les clés de cache : le résultat diffère d'une transcription d'un seul tenant).
+        """
+        return {"mode": "long", "chunk_sec": self.chunk_sec, "overlap_sec": self.overlap_sec}
+
+    def transcribe_samples(self, samples, speech_timestamps=None):
+        """
+        Transcrit un signal mono float32 à 16 kHz.
+
+        - speech_timestamps : timestamps VAD (en échantillons à 16 kHz), détectés si absents
+        Retourne {"segments": [...], "language": ...} avec des timestamps absolus.
+        """
+        if speech_timestamps is None:
+            speech_timestamps = detect_speech(samples, self.vad_pool)
+        chunks = overlapping_chunks(
+            plan_chunks(speech_timestamps, len(samples), self.chunk_samples - self.overlap_samples),
+            self.overlap_samples
+        )
+        if not chunks:
+            return {"segments": [], "language": self.backend.language}
+
+        def transcribe_chunk(chunk):
+            start, _, end = chunk
+            result = self.backend.transcribe(samples[start:end])
+            return result, shift_segments(result["segments"], start / ASR_SAMPLING_RATE)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            outputs = list(executor.map(transcribe_chunk, chunks))
+
+        owned_bounds = [(own_start / ASR_SAMPLING_RATE, end / ASR_SAMPLING_RATE) for _, own_start, end in chunks]
+        # le morceau suivant reprend là où commence sa zone propre
+        owned_bounds = [
+            (own_start, owned_bounds[i + 1][0] if i + 1 < len(owned_bounds) else end)
+            for i, (own_start, end) in enumerate(owned_bounds)
+        ]
+        segments = stitch_segments([segments for _, segments in outputs], owned_bounds)
+        return {"segments": segments, "language": outputs[0][0].get("language", self.backend.language)}
+
+    def transcribe_file(self, audio_path, speech_timestamps=None):
+        return self.transcribe_samples(load_audio(audio_path), speech_timestamps)
+
+
+if __name__ == "__main__":
+    from transcriber import Transcriber
+
+    audio_path = sys.argv[1]
+    long_transcriber = LongAudioTranscriber()
+    transcriber = Transcriber(audio_path, backend=long_transcriber.backend)
+    transcriber.set_result(long_transcriber.transcribe_file(audio_path))
+    transcriber.save_transcript()
@@ -0,0 +1,263 @@
+import gc
+import os
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MEMORY_BUDGET_BYTES = 12 * 1024 ** 3
+
+# taille approximative des poids en float16, utilisée quand le modèle n'expose pas ses paramètres
+MODEL_SIZE_ESTIMATES = {
+    "tiny": 75 * 1024 ** 2,
+    "base": 145 * 1024 ** 2,
+    "small": 480 * 1024 ** 2,
+    "medium": 1.5 * 1024 ** 3,
+    "large": 3.1 * 1024 ** 3,
+}
+COMPUTE_TYPE_FACTORS = {"int8": 0.5, "int8_float16": 0.5, "int8_float32": 0.5, "float32": 2.0}
+DEFAULT_MODEL_SIZE = 1024 ** 3
+
+# Chargeurs par backend : fonction (nom du modèle, device, compute_type, **options) -> modèle.
+# Les imports sont faits à la demande, chaque backend n'est requis que s'il est utilisé.
+
+def _load_whisper(model_name, device, compute_type=None, cpu_threads=0, **options):
+    import whisper
+    if device == "cpu" and cpu_threads:
+        # pool de threads torch commun au processus : fixé une fois, au chargement, et non à chaque appel
+        import torch
+        torch.set_num_threads(cpu_threads)
+    model = whisper.load_model(model_name, device)
+    if compute_type == "int8":
+        # quantification dynamique des couches linéaires (CPU uniquement)
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def _load_faster_whisper(model_name, device, compute_type=None, **options):
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_name, device=device, compute_type=compute_type or "default", **options)
+
+def _load_whisperx(model_name, device, compute_type=None, **options):
+    import whisperx
+    return whisperx.load_model(model_name, device, compute_type=compute_type or "float16", **options)
+
+def _load_whisperx_align(model_name, device, compute_type=None, **options):
+    # model_name : code de langue, retourne (modèle, métadonnées)
+    import whisperx
+    return whisperx.load_align_model(language_code=model_name, device=device, **options)
+
+def _load_pyannote(model_name, device, compute_type=None, **options):
+    import torch
+    from pyannote.audio import Pipeline
+    return Pipeline.from_pretrained(model_name, **options).to(torch.device(device))
+
+def _load_llama_cpp(model_name, device, compute_type=None, **options):
+    # model_name : chemin du fichier GGUF (quantification déjà choisie dans le fichier)
+    from llama_cpp import Llama
+    if device == "cuda":
+        options.setdefault("n_gpu_layers", -1)
+    return Llama(model_path=model_name, verbose=False, **options)
+
+LOADERS = {
+    "whisper": _load_whisper,
+    "faster-whisper": _load_faster_whisper,
+    "whisperx": _load_whisperx,
+    "whisperx-align": _load_whisperx_align,
+    "pyannote": _load_pyannote,
+    "llama-cpp": _load_llama_cpp,
+}
+
+def estimate_size(model, model_name, compute_type=None):
+    """
+    Taille mémoire d'un modèle : somme des paramètres torch si possible, sinon estimation par nom.
+    """
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except (AttributeError, TypeError):
+        pass
+    if os.path.isfile(model_name):
+        # poids lus depuis un fichier (GGUF) : taille du fichier
+        return os.path.getsize(model_name)
+    size = DEFAULT_MODEL_SIZE
+    for name, estimate in MODEL_SIZE_ESTIMATES.items():
+        if name in model_name:
+            size = estimate
+            break
+    return int(size * COMPUTE_TYPE_FACTORS.get(compute_type, 1.0))
+
+def release_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def max_concurrent_users(backend, options):
+    """
+    Nombre d'appels simultanés possibles sur une même instance. Seul CTranslate2 (faster-whisper) accepte
+    plusieurs transcriptions en parallèle (num_workers) ; openai-whisper (hooks du cache KV posés sur le module),
+    whisperx (état du tokenizer et des options par appel), pyannote et llama.cpp ne sont pas réentrants.
+    """
+    if backend == "faster-whisper":
+        return max(int(options.get("num_workers", 1)), 1)
+    return 1
+
+
+class _Entry:
+    def __init__(self, max_users=1):
+        self.lock = threading.Lock()  # un seul chargement par clé
+        self.slots = threading.Semaphore(max_users)  # utilisations simultanées du modèle
+        self.model = None
+        self.size = 0
+        self.users = 0
+
+
+class ModelRegistry:
+    """
+    Registre des modèles partagé par le processus, indexé par (backend, modèle, device, compute_type, options).
+    Chaque modèle est chargé une seule fois, au premier usage, puis partagé entre les threads ; un modèle
+    non réentrant n'est utilisé que par un bloc with à la fois (voir max_concurrent_users).
+    Quand la somme des tailles dépasse memory_budget, les modèles inutilisés les moins récemment
+    demandés sont libérés (LRU) ; un modèle en cours d'utilisation n'est jamais libéré.
+
+    - memory_budget : mémoire maximale occupée par les modèles (octets)
+    """
+    def __init__(self, memory_budget=MEMORY_BUDGET_BYTES):
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    @staticmethod
+    def make_key(backend, model_name, device, compute_type=None, **options):
+        frozen = tuple(sorted(
+            (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+            for name, value in options.items()
+        ))
+        return (backend, model_name, device, compute_type, frozen)
+
+    @contextmanager
+    def use(self, backend, model_name, device="cpu", compute_type=None, **options):
+        """
+        Fournit le modèle (chargé si besoin) et le protège de l'éviction pendant le bloc with.
+        Le bloc attend qu'une place se libère si le modèle est déjà utilisé par d'autres threads
+        au maximum de ses appels simultanés.
+        """
+        key = self.make_key(backend, model_name, device, compute_type, **options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(max_concurrent_users(backend, options))
+            entry.users += 1
+            self._entries.move_to_end(key)
+        try:
+            with entry.lock:
+                if entry.model is None:
+                    self._load(entry, backend, model_name, device, compute_type, options)
+                else:
+                    with self._lock:
+                        self.hits += 1
+            with entry.slots:
+                yield entry.model
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.model is None and entry.users == 0 and self._entries.get(key) is entry:
+                    del self._entries[key]  # échec du chargement
+            self.evict()
+
+    def get(self, backend, model_name, device="cpu", compute_type=None, **options):
+        """
+        Retourne le modèle sans le réserver : il peut être libéré plus tard si la mémoire manque,
+        et l'appelant doit s'assurer lui-même qu'il ne l'utilise pas en même temps qu'un autre thread.
+        """
+        with self.use(backend, model_name, device, compute_type, **options) as model:
+            return model
+
+    def _load(self, entry, backend, model_name, device, compute_type, options):
+        if backend not in LOADERS:
+            raise ValueError(f"Backend inconnu : {backend} (attendu : {', '.join(LOADERS)})")
+        start = time.perf_counter()
+        print(f"Chargement du modèle {backend}/{model_name} ({device}, {compute_type or 'défaut'})...")
+        model = LOADERS[backend](model_name, device, compute_type, **options)
+        elapsed = time.perf_counter() - start
+        entry.size = estimate_size(model[0] if isinstance(model, tuple) else model, model_name, compute_type)
+        entry.model = model
+        with self._lock:
+            self.loads += 1
+            self.load_time += elapsed
+
+    def evict(self):
+        """
+        Libère les modèles inutilisés les moins récemment demandés tant que le budget mémoire est dépassé.
+        """
+        released = False
+        with self._lock:
+            total = sum(e.size for e in self._entries.values() if e.model is not None)
+            # le dernier modèle demandé est toujours gardé, même s'il dépasse à lui seul le budget
+            for key in list(self._entries)[:-1]:
+                if total <= self.memory_budget:
+                    break
+                entry = self._entries[key]
+                if entry.users == 0 and entry.model is not None:
+                    total -= entry.size
+                    del self._entries[key]
+                    entry.model = None
+                    self.evictions += 1
+                    released = True
+        if released:
+            release_memory()
+
+    def discard(self, backend, model_name, device="cpu", compute_type=None, **options):
+        """
+        Libère un modèle devenu inutile (par exemple remplacé par une autre configuration), s'il n'est pas utilisé.
+        """
+        key = self.make_key(backend, model_name, device, compute_type, **options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.users:
+                return False
+            del self._entries[key]
+            entry.model = None
+        release_memory()
+        return True
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                entry.model = None
+            self._entries.clear()
+        release_memory()
+
+    def stats(self):
+        with self._lock:
+            loaded = [(k[0], k[1], k[2], k[3]) for k, e in self._entries.items() if e.model is not None]
+            return {
+                "models": loaded,
+                "bytes": sum(e.size for e in self._entries.values() if e.model is not None),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "load_time": round(self.load_time, 1),
+            }
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+def get_model_registry():
+    """
+    Registre de modèles partagé par le processus.
+    """
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = ModelRegistry()
+        return _REGISTRY
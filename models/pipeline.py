@@ -1,14 +1,29 @@
 import os
+import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from audio_processor import AudioProcessor
 from transcriber import Transcriber
 from file_cleaner import FileCleaner
+from vad_pool import get_vad_pool
+from quality_plots import shutdown_plot_renderer
+from content_cache import ContentCache
+from quality_log import QualityLog
+from model_registry import get_model_registry
+from transcription_backends import create_backend
+from batch_transcription import BatchTranscriber
 
 from threading import current_thread
 
 NUM_THREADS = 4
 INPUT_DIR = "data/audio/hospital"
 TRANSCRIPT_DIR = "data/transcript"
+PLOT_MODE = "summary"  # "off" en production, "async" pour générer les PNG pendant le traitement
+AUDIO_CACHE_DIR = "data/cache/audio"
+AUDIO_CACHE_MAX_BYTES = 5 * 1024 ** 3
+# "auto", "faster-whisper", "whisperx" ou "whisper" (voir transcription_backends)
+TRANSCRIPTION_BACKEND = "auto"
+# True : les fichiers acceptés sont transcrits ensemble, en lots partagés (voir batch_transcription)
+BATCH_TRANSCRIPTION = True
 
 def clean():
     # Nettoyage des audio & transcriptions
@@ -16,18 +31,33 @@ def clean():
         cleaner = FileCleaner(directory)
         cleaner.remove_cleaned_files()
 
-def process_audio_pipeline(audio_path):
+def process_audio_pipeline(audio_path, audio_cache=None, quality_log=None, backend=None, batch=False):
+    """
+    Analyse et nettoie un fichier, puis le transcrit.
+    Avec batch=True, la transcription est laissée à l'appelant : retourne le chemin de l'audio nettoyé
+    à transcrire et ses timestamps de parole (None si le fichier est rejeté ou déjà transcrit).
+    """
     try:
         thread_name = current_thread().name
         print(f"\n[{thread_name}] : Traitement de {audio_path}")
 
-        processor = AudioProcessor(audio_path)
+        processor = AudioProcessor(audio_path, plot_mode=PLOT_MODE, cache=audio_cache, quality_log=quality_log)
         if not processor.process():
             print(f"[{thread_name}] : Audio rejeté (qualité) pour {audio_path}")
             return
 
+        # fichier inchangé déjà transcrit : rien à refaire
+        base_name = os.path.splitext(os.path.basename(processor.cleaned_path))[0]
+        if processor.from_cache and os.path.exists(os.path.join(TRANSCRIPT_DIR, f"{base_name}.txt")):
+            print(f"[{thread_name}] : Déjà traité, ignoré ({audio_path}).")
+            return
+
+        if batch:
+            return processor.cleaned_path, processor.cleaned_speech_timestamps()
+
         # Transcription
-        transcriber = Transcriber(processor.cleaned_path)
+        transcriber = Transcriber(processor.cleaned_path, backend=backend,
+                                  speech_timestamps=processor.cleaned_speech_timestamps())
         transcriber.transcribe()
         transcriber.save_transcript()
 
@@ -36,8 +66,35 @@ def process_audio_pipeline(audio_path):
     except Exception as e:
         print(f"[{thread_name}] : Erreur lors du traitement de ({audio_path}) : {e}")
 
+def transcribe_batch(cleaned_files, backend):
+    """
+    - cleaned_files : liste de (chemin de l'audio nettoyé, timestamps de parole ou None)
+    Les fichiers qui n'ont pas pu être transcrits sont consignés dans rejected_transcriptions.txt.
+    """
+    batch = BatchTranscriber(backend)
+    cleaned_paths = [path for path, _ in cleaned_files]
+    print(f"Transcription par lots de {len(cleaned_paths)} fichiers...")
+    errors = {}
+    results = batch.transcribe_files(cleaned_paths, [timestamps for _, timestamps in cleaned_files], errors=errors)
+    for cleaned_path, result in results.items():
+        if result is None:
+            continue
+        try:
+            transcriber = Transcriber(cleaned_path, backend=backend)
+            transcriber.set_result(result)
+            transcriber.save_transcript()
+        except Exception as e:
+            print(f"Erreur lors de la sauvegarde de la transcription de ({cleaned_path}) : {e}")
+    if errors:
+        print(f"{len(errors)} fichier(s) non transcrit(s), voir {TRANSCRIPT_DIR}/rejected_transcriptions.txt")
+        with open(os.path.join(TRANSCRIPT_DIR, "rejected_transcriptions.txt"), "a") as f:
+            for cleaned_path, error in errors.items():
+                f.write(f"FAILED: {cleaned_path} | {error}\n")
+
 def main():
-    clean()
+    # les résultats sont repris du cache : le nettoyage complet n'est fait que sur demande
+    if "--clean" in sys.argv:
+        clean()
 
     audio_files = [
         os.path.join(INPUT_DIR, f)
@@ -49,14 +106,44 @@ def main():
         print("Aucun fichier audio à traiter.")
         return
     
-    print(f"Lancement du traitement avec {NUM_THREADS} threads...\n")
-    with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
-        futures = [executor.submit(process_audio_pipeline, audio) for audio in audio_files]
+    # un modèle VAD par thread au maximum, partagé entre tous les fichiers
+    vad_pool = get_vad_pool(NUM_THREADS)
+    audio_cache = ContentCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+    # un seul écrivain pour le journal de qualité, les workers ne font que déposer leurs lignes
+    quality_log = QualityLog()
+    # NUM_THREADS fichiers transcrits en même temps : un seul modèle, dimensionné pour eux (faster-whisper),
+    # réutilisé aussi par les enregistrements longs
+    backend = create_backend(TRANSCRIPTION_BACKEND, workers=NUM_THREADS)
+    # sans inférence par lots (openai-whisper), chaque fichier est transcrit dès qu'il est nettoyé
+    batch = BATCH_TRANSCRIPTION and backend.batched
+
+    print(f"Lancement du traitement avec {NUM_THREADS} threads ({backend})...\n")
+    try:
+        with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+            futures = [
+                executor.submit(process_audio_pipeline, audio, audio_cache, quality_log, backend, batch)
+                for audio in audio_files
+            ]
 
-        for future in as_completed(futures):
-            future.result()
+            to_transcribe = []
+            for future in as_completed(futures):
+                cleaned = future.result()
+                if cleaned:
+                    to_transcribe.append(cleaned)
 
+        if to_transcribe:
+            transcribe_batch(sorted(to_transcribe, key=lambda item: item[0]), backend)
+    finally:
+        # graphiques en attente et journal de qualité écrits même si le traitement s'interrompt
+        shutdown_plot_renderer()
+        quality_log.close()
     print("\nTraitement terminé pour tous les fichiers.")
+    print(f"VAD : {vad_pool.stats()}")
+    print(f"Cache audio : {audio_cache.stats()}")
+    print(f"Modèles : {get_model_registry().stats()}")
+    print(f"Journal de qualité ({quality_log.run_id}) :")
+    for profile, total, rejected, rate in quality_log.rejection_rate_by_profile(quality_log.run_id):
+        print(f" - {profile} : {rejected}/{total} rejetés ({rate:.0%})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
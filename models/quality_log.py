@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import sqlite3
+import threading
+
+QUALITY_DB = "audio_quality_log.db"
+PROFILES_PATH = "models/audio_profiles.json"
+BATCH_SIZE = 64
+FLUSH_INTERVAL_SEC = 1.0
+
+METRIC_COLUMNS = [
+    ("file", "TEXT"),
+    ("profile", "TEXT"),
+    ("duration", "REAL"),
+    ("rms", "INTEGER"),
+    ("saturation_count", "INTEGER"),
+    ("dominant_freq", "REAL"),
+    ("mean_freq", "REAL"),
+    ("bandwidth", "REAL"),
+    ("noise_level", "REAL"),
+    ("spectral_centroid", "REAL"),
+    ("spectral_rolloff", "REAL"),
+    ("zero_crossing_rate", "REAL"),
+    ("clipping_ratio", "REAL"),
+    ("silence_ratio", "REAL"),
+    ("raw_rms", "INTEGER"),
+    ("rejected", "INTEGER"),
+    ("rejection_tier", "TEXT"),
+    ("rejection_reasons", "TEXT"),
+    ("prescreen_time", "REAL"),
+    ("analysis_time", "REAL"),
+    ("from_cache", "INTEGER"),
+]
+
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS quality_metrics (
+        id INTEGER PRIMARY KEY,
+        run_id TEXT NOT NULL,
+        logged_at REAL NOT NULL,
+        {", ".join(f"{name} {kind}" for name, kind in METRIC_COLUMNS)}
+    )""",
+    """CREATE TABLE IF NOT EXISTS rejection_reasons (
+        metric_id INTEGER NOT NULL REFERENCES quality_metrics(id),
+        run_id TEXT NOT NULL,
+        file TEXT NOT NULL,
+        reason TEXT NOT NULL,
+        detail TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_metrics_file ON quality_metrics(file)",
+    "CREATE INDEX IF NOT EXISTS idx_metrics_run ON quality_metrics(run_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reasons_reason ON rejection_reasons(reason)",
+    "CREATE INDEX IF NOT EXISTS idx_reasons_run ON rejection_reasons(run_id)",
+]
+
+def load_profiles(path=PROFILES_PATH):
+    """
+    Charge la correspondance nom de fichier -> profil audio (audio_profiles.json).
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {item["filename"]: item["profile"] for item in json.load(f)}
+    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
+        print(f"Profils audio indisponibles ({path}) : {e}")
+        return {}
+
+def split_reason(reason):
+    """
+    "RMS trop faible: 1520" -> ("RMS trop faible", "1520") : la première partie sert d'index.
+    """
+    name, _, detail = reason.partition(":")
+    return name.strip(), detail.strip()
+
+
+class QualityLog:
+    """
+    Journal des métriques de qualité dans une base SQLite, avec un seul thread écrivain.
+    Les workers déposent leurs lignes dans une file (jamais d'attente sur le disque) ; l'écrivain
+    les insère par lots dans une transaction. Les raisons de rejet sont aussi stockées une par ligne,
+    indexées, pour les statistiques.
+
+    - db_path : chemin de la base SQLite
+    - run_id : identifiant du lancement (généré si absent)
+    - profiles : correspondance fichier -> profil (audio_profiles.json par défaut)
+    """
+    def __init__(self, db_path=QUALITY_DB, run_id=None, profiles=None):
+        self.db_path = db_path
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.profiles = load_profiles() if profiles is None else profiles
+        self._rows = queue.Queue()
+        self._closed = False
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            # bases créées avant l'ajout d'une colonne
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(quality_metrics)")}
+            for name, kind in METRIC_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE quality_metrics ADD COLUMN {name} {kind}")
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="quality-log-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def log(self, metrics):
+        """
+        Ajoute une ligne (dictionnaire de métriques d'AudioProcessor) ; ne bloque jamais l'appelant.
+        """
+        if self._closed:
+            raise RuntimeError("Journal de qualité fermé")
+        row = dict(metrics)
+        row.setdefault("profile", self.profiles.get(row.get("file")))
+        self._rows.put((time.time(), row))
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                batch = []
+                deadline = time.monotonic() + FLUSH_INTERVAL_SEC
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        item = self._rows.get(timeout=max(deadline - time.monotonic(), 0.01))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                if batch:
+                    try:
+                        self._insert(conn, batch)
+                    except sqlite3.Error as e:
+                        print(f"Erreur lors de l'écriture du journal de qualité : {e}")
+        finally:
+            conn.close()
+
+    def _insert(self, conn, batch):
+        names = [name for name, _ in METRIC_COLUMNS]
+        insert_metrics = (
+            f"INSERT INTO quality_metrics (run_id, logged_at, {', '.join(names)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in names)})"
+        )
+        with conn:
+            for logged_at, row in batch:
+                cursor = conn.execute(insert_metrics, [self.run_id, logged_at] + [row.get(name) for name in names])
+                reasons = row.get("rejection_reasons") or ""
+                conn.executemany(
+                    "INSERT INTO rejection_reasons (metric_id, run_id, file, reason, detail) VALUES (?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, self.run_id, row.get("file")) + split_reason(r)
+                     for r in reasons.split("; ") if r]
+                )
+
+    def close(self):
+        """
+        Vide la file et arrête l'écrivain (à appeler en fin de traitement).
+        """
+        if not self._closed:
+            self._closed = True
+            self._rows.put(None)
+            self._writer.join()
+
+    # Requêtes
+
+    def query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def rejection_rate_by_profile(self, run_id=None):
+        """
+        Taux de rejet par profil audio : [(profil, total, rejetés, taux)].
+        """
+        where, params = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        return self.query(
+            f"""SELECT COALESCE(profile, 'inconnu'), COUNT(*), SUM(rejected), ROUND(AVG(rejected), 3)
+                FROM quality_metrics {where} GROUP BY 1 ORDER BY 2 DESC""",
+            params
+        )
+
+    def rejection_reason_counts(self, run_id=None):
+        """
+        Nombre de rejets par raison : [(raison, nombre)].
+        """
+        where, params = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        return self.query(
+            f"SELECT reason, COUNT(*) FROM rejection_reasons {where} GROUP BY reason ORDER BY 2 DESC",
+            params
+        )
+
+    def rejection_rate_by_tier(self, run_id=None):
+        """
+        Décisions et temps de calcul par niveau : [(niveau, nombre, temps pré-filtre, temps analyse)].
+        """
+        where, params = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        return self.query(
+            f"""SELECT COALESCE(rejection_tier, 'accepté'), COUNT(*),
+                       ROUND(SUM(prescreen_time), 2), ROUND(SUM(analysis_time), 2)
+                FROM quality_metrics {where} GROUP BY 1 ORDER BY 2 DESC""",
+            params
+        )
+
+    def file_history(self, file_name):
+        """
+        Historique des analyses d'un fichier : [(run_id, date, rejeté, raisons)].
+        """
+        return self.query(
+            """SELECT run_id, datetime(logged_at, 'unixepoch'), rejected, rejection_reasons
+               FROM quality_metrics WHERE file = ? ORDER BY logged_at""",
+            (file_name,)
+        )
+
+
+_LOG = None
+_LOG_LOCK = threading.Lock()
+
+def get_quality_log():
+    """
+    Journal de qualité partagé par le processus (créé au premier appel, fermé à la sortie).
+    """
+    global _LOG
+    with _LOG_LOCK:
+        if _LOG is None:
+            _LOG = QualityLog()
+            atexit.register(_LOG.close)
+        return _LOG
+
+
+# statistiques : python models/quality_log.py [run_id]
+if __name__ == "__main__":
+    if not os.path.exists(QUALITY_DB):
+        print(f"Aucun journal trouvé ({QUALITY_DB}).")
+        sys.exit(0)
+    run_id = sys.argv[1] if len(sys.argv) > 1 else None
+    log = QualityLog(profiles={})
+    print("Taux de rejet par profil :")
+    for profile, total, rejected, rate in log.rejection_rate_by_profile(run_id):
+        print(f" - {profile} : {rejected}/{total} ({rate:.0%})")
+    print("Raisons de rejet :")
+    for reason, count in log.rejection_reason_counts(run_id):
+        print(f" - {reason} : {count}")
+    print("Par niveau de décision :")
+    for tier, count, prescreen_time, analysis_time in log.rejection_rate_by_tier(run_id):
+        print(f" - {tier} : {count} fichiers (pré-filtre {prescreen_time}s, analyse {analysis_time}s)")
+    log.close()
@@ -0,0 +1,234 @@
+import os
+import sys
+import uuid
+import queue
+import atexit
+import threading
+import multiprocessing as mp
+import numpy as np
+
+PLOTS_DIR = "plots"
+# "off" : aucun graphique (production), "summary" : résumé .npz rendu plus tard à la demande,
+# "async" : rendu dans un processus séparé, "sync" : rendu immédiat dans le thread appelant
+PLOT_MODES = ("off", "summary", "async", "sync")
+PLOT_MODE = "summary"
+MAX_PLOT_POINTS = 4000
+PLOT_QUEUE_SIZE = 64
+
+def _bucket_starts(n, n_points):
+    return np.unique(np.linspace(0, n, n_points + 1).astype(np.int64)[:-1])
+
+def minmax_envelope(samples, sr, n_points=MAX_PLOT_POINTS, offset=0):
+    """
+    Décimation min/max d'un signal : n_points intervalles, chacun réduit à son minimum et à son maximum,
+    ce qui conserve les pics visibles à l'écran. Retourne (temps, min, max).
+
+    - samples : signal mono
+    - sr : fréquence d'échantillonnage
+    - n_points : nombre d'intervalles
+    - offset : position du premier échantillon dans le fichier (en échantillons)
+    """
+    if len(samples) == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+    idx = _bucket_starts(len(samples), min(n_points, len(samples)))
+    return (offset + idx) / sr, np.minimum.reduceat(samples, idx), np.maximum.reduceat(samples, idx)
+
+def reduce_envelope(t, lower, upper, n_points=MAX_PLOT_POINTS):
+    """
+    Réduit une enveloppe (temps, min, max) déjà décimée à n_points intervalles au plus.
+    """
+    if len(t) <= n_points:
+        return t, lower, upper
+    idx = _bucket_starts(len(t), n_points)
+    return t[idx], np.minimum.reduceat(lower, idx), np.maximum.reduceat(upper, idx)
+
+def log_binned_spectrum(xf, yf, n_bins=MAX_PLOT_POINTS):
+    """
+    Moyenne des magnitudes par bandes de fréquence logarithmiques (au plus n_bins points).
+    Les bandes basses, plus étroites que la résolution, gardent leurs points d'origine.
+    """
+    if len(xf) <= n_bins:
+        return xf, yf
+    positive = xf > 0
+    xp, yp = xf[positive], yf[positive]
+    edges = np.geomspace(xp[0], xp[-1], n_bins + 1)
+    band = np.clip(np.searchsorted(edges, xp, side="right") - 1, 0, n_bins - 1)
+    counts = np.bincount(band, minlength=n_bins)
+    keep = counts > 0
+    x = np.bincount(band, weights=xp, minlength=n_bins)[keep] / counts[keep]
+    y = np.bincount(band, weights=yp, minlength=n_bins)[keep] / counts[keep]
+    return np.concatenate([xf[~positive], x]), np.concatenate([yf[~positive], y])
+
+def build_summary(name, wave_t, wave_min, wave_max, xf, yf, metrics):
+    """
+    Construit le résumé compact d'un graphique de qualité : enveloppe min/max du signal
+    et spectre moyenné par bandes logarithmiques, au plus MAX_PLOT_POINTS points par courbe.
+
+    - name : nom du fichier audio (sans extension)
+    - wave_t, wave_min, wave_max : enveloppe du signal temporel (temps, bornes basse et haute)
+    - xf, yf : spectre fréquentiel
+    - metrics : dictionnaire rms / noise_level / spectral_centroid
+    """
+    wave_t, wave_min, wave_max = reduce_envelope(wave_t, wave_min, wave_max)
+    xf, yf = log_binned_spectrum(xf, yf)
+    return {
+        "name": name,
+        "wave_t": np.asarray(wave_t, dtype=np.float32),
+        "wave_min": np.asarray(wave_min, dtype=np.float32),
+        "wave_max": np.asarray(wave_max, dtype=np.float32),
+        "xf": np.asarray(xf, dtype=np.float32),
+        "yf": np.asarray(yf, dtype=np.float32),
+        "rms": metrics["rms"],
+        "noise_level": metrics["noise_level"],
+        "spectral_centroid": metrics["spectral_centroid"],
+    }
+
+def _replace(temp_path, final_path):
+    # écriture dans un fichier temporaire puis renommage, pour ne jamais laisser de fichier partiel
+    if os.path.exists(temp_path):
+        os.replace(temp_path, final_path)
+
+def save_summary(summary, plots_dir=PLOTS_DIR):
+    os.makedirs(plots_dir, exist_ok=True)
+    temp_path = os.path.join(plots_dir, f"{summary['name']}_{uuid.uuid4().hex[:8]}.npz")
+    final_path = os.path.join(plots_dir, f"{summary['name']}.npz")
+    np.savez_compressed(temp_path, **summary)
+    _replace(temp_path, final_path)
+    return final_path
+
+def load_summary(npz_path):
+    with np.load(npz_path) as data:
+        summary = {key: data[key] for key in data.files}
+    for key in ("name", "rms", "noise_level", "spectral_centroid"):
+        summary[key] = summary[key].item()
+    return summary
+
+def render_summary(summary, plots_dir=PLOTS_DIR):
+    """
+    Rend le graphique de qualité en PNG. Utilise une Figure matplotlib indépendante
+    (pas d'état global pyplot), donc sans verrou entre threads.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    name = summary["name"]
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+
+    # Signal temporel
+    ax = fig.add_subplot(2, 2, 1)
+    ax.fill_between(summary["wave_t"], summary["wave_min"], summary["wave_max"], color='gray', alpha=0.7)
+    ax.set_title(f"{name} - Signal temporel")
+    ax.set_xlabel("Temps (s)")
+    ax.set_ylabel("Amplitude")
+
+    # Spectre fréquentiel
+    centroid = summary["spectral_centroid"]
+    ax = fig.add_subplot(2, 2, 2)
+    ax.plot(summary["xf"], summary["yf"], color='blue')
+    ax.axvline(centroid, color='red', linestyle='--', label=f'Centroïde: {centroid:.0f}Hz')
+    ax.set_title("Spectre fréquentiel")
+    ax.set_xlabel("Fréquence (Hz)")
+    ax.set_ylabel("Magnitude")
+    ax.legend()
+
+    # Métriques de qualité
+    ax = fig.add_subplot(2, 2, 3)
+    metrics = [
+        f"RMS: {summary['rms']}",
+        f"Bruit: {summary['noise_level']:.2f}",
+        f"Centroïde: {centroid:.0f}Hz"
+    ]
+    for i, metric in enumerate(metrics):
+        ax.text(0.1, 0.9 - i*0.15, metric, transform=ax.transAxes)
+    ax.set_title("Métriques de qualité")
+    ax.axis('off')
+
+    fig.tight_layout()
+    os.makedirs(plots_dir, exist_ok=True)
+    temp_path = os.path.join(plots_dir, f"{name}_{uuid.uuid4().hex[:8]}.png")
+    final_path = os.path.join(plots_dir, f"{name}.png")
+    fig.savefig(temp_path, dpi=150, bbox_inches='tight')
+    _replace(temp_path, final_path)
+    return final_path
+
+def _render_worker(summaries, plots_dir):
+    while True:
+        summary = summaries.get()
+        if summary is None:
+            break
+        try:
+            render_summary(summary, plots_dir)
+        except Exception as e:
+            print(f"Erreur lors du rendu du graphique {summary.get('name')} : {e}")
+
+
+class PlotRenderer:
+    """
+    Rendu des graphiques dans un processus séparé : les workers déposent des résumés compacts dans une file,
+    le débit du pipeline ne dépend plus de matplotlib. Si la file est pleine, le résumé est sauvegardé
+    en .npz pour être rendu plus tard au lieu de bloquer le worker.
+    """
+    def __init__(self, plots_dir=PLOTS_DIR, queue_size=PLOT_QUEUE_SIZE):
+        ctx = mp.get_context("spawn")
+        self.plots_dir = plots_dir
+        self.summaries = ctx.Queue(maxsize=queue_size)
+        self.process = ctx.Process(target=_render_worker, args=(self.summaries, plots_dir), daemon=True)
+        self.process.start()
+
+    def submit(self, summary):
+        try:
+            self.summaries.put_nowait(summary)
+        except queue.Full:
+            save_summary(summary, self.plots_dir)
+
+    def close(self):
+        if self.process.is_alive():
+            self.summaries.put(None)
+            self.process.join()
+
+
+_RENDERER = None
+_RENDERER_LOCK = threading.Lock()
+
+def get_plot_renderer():
+    global _RENDERER
+    with _RENDERER_LOCK:
+        if _RENDERER is None:
+            _RENDERER = PlotRenderer()
+            atexit.register(_RENDERER.close)
+        return _RENDERER
+
+def shutdown_plot_renderer():
+    """
+    Attend la fin des rendus en cours (à appeler en fin de pipeline).
+    """
+    global _RENDERER
+    with _RENDERER_LOCK:
+        if _RENDERER is not None:
+            _RENDERER.close()
+            _RENDERER = None
+
+def dispatch(summary, mode=PLOT_MODE):
+    """
+    Traite un résumé selon le mode de tracé (voir PLOT_MODES).
+    """
+    if mode == "off":
+        return
+    if mode == "summary":
+        save_summary(summary)
+    elif mode == "async":
+        get_plot_renderer().submit(summary)
+    elif mode == "sync":
+        render_summary(summary)
+    else:
+        raise ValueError(f"Mode de tracé inconnu : {mode} (attendu : {', '.join(PLOT_MODES)})")
+
+
+# rendu à la demande des résumés sauvegardés : python models/quality_plots.py [plots]
+if __name__ == "__main__":
+    plots_dir = sys.argv[1] if len(sys.argv) > 1 else PLOTS_DIR
+    summaries = [f for f in sorted(os.listdir(plots_dir)) if f.endswith(".npz")]
+    for file_name in summaries:
+        render_summary(load_summary(os.path.join(plots_dir, file_name)), plots_dir)
+    print(f"{len(summaries)} graphiques générés dans {plots_dir}")
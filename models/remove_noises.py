@@ -1,5 +1,6 @@
 import torch
-from silero_vad import load_silero_vad, read_audio, get_speech_timestamps
+from silero_vad import read_audio, get_speech_timestamps
+from vad_pool import get_vad_pool
 from pydub import AudioSegment, effects
 import os
 from transcription import transcription
@@ -18,9 +19,6 @@ def extract_speech(audio_path, output_path=None,
                    speech_pad_ms=250, min_segment_ms=100, 
                    model=None):
 
-    if model is None:
-        model = load_silero_vad()
-
     audio = AudioSegment.from_wav(audio_path)
     preprocessed = preprocess_audio(audio)
 
@@ -48,15 +46,18 @@ def extract_speech(audio_path, output_path=None,
         # Lecture pour Silero (numpy)
         wav = read_audio(tmp_path, sampling_rate=16000)
 
-        # Détection voix
-        speech_timestamps = get_speech_timestamps(
-            wav, model,
+        # Détection voix (modèle fourni, sinon modèle emprunté au pool partagé)
+        vad_params = dict(
             sampling_rate=16000,
             threshold=threshold,
             min_speech_duration_ms=min_speech_ms,
             speech_pad_ms=speech_pad_ms,
             return_seconds=False
         )
+        if model is not None:
+            speech_timestamps = get_speech_timestamps(wav, model, **vad_params)
+        else:
+            speech_timestamps = get_vad_pool().get_speech_timestamps(wav, **vad_params)
 
         # Reconstruction audio
         cleaned = AudioSegment.empty()
@@ -88,13 +89,12 @@ def extract_speech(audio_path, output_path=None,
 
 if __name__ == "__main__":
 
-    model = load_silero_vad()
     audio_dir = "data/audio/hospital"
     for file_name in os.listdir(audio_dir):
         if file_name.lower().endswith(".wav"):
             audio_path = os.path.join(audio_dir, file_name)
             print(f"\Traitement de : {audio_path}")
-            cleaned_path = extract_speech(audio_path, model)
+            cleaned_path = extract_speech(audio_path)
             if cleaned_path:
                 transcription_text, rejected = transcription(cleaned_path)
             else:
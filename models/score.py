@@ -1,5 +1,6 @@
 import re
 import json
+from transcript_format import TranscriptReader
 
 # Charger les bases de données de keywords
 with open("data/sca_words.json", "r", encoding="utf-8") as f:
@@ -40,8 +41,12 @@ with open("data/last_filename.txt", "r", encoding="utf-8") as f:
     filename = f.read().strip()
 
 diarized_path = f"data/raw/{filename.replace('.m4a', '_diarized.txt')}"
-with open(diarized_path, "r", encoding="utf-8") as f:
-    texte = f.read().lower()
+if TranscriptReader.exists(diarized_path):
+    # colonne de texte déjà en minuscules : ni timecodes ni locuteurs à reparser
+    texte = "\n".join(TranscriptReader(diarized_path).texts("text_lower"))
+else:
+    with open(diarized_path, "r", encoding="utf-8") as f:
+        texte = f.read().lower()
 
 
 #  Extraction de l'âge du patient
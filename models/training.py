@@ -5,13 +5,22 @@ from transformers import CamembertTokenizer, CamembertForSequenceClassification
 from transformers import Trainer, TrainingArguments
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from labelled_dataset import is_unfinished
 
+# exemples labellisés par logits avec une température ajustée (LlamaLabeller.calibrate) : on écarte les moins sûrs ;
+# les exemples sans confiance (pas de calibration, mode "generate") sont tous gardés
+MIN_LABEL_CONFIDENCE = 0.8
 
 # on charge le fichier contenant le dataset pour entraîner le modèle 
 data = []
 with open("training_data.jsonl", "r", encoding="utf-8") as f:
     for line in f:
         obj = json.loads(line)
+        # label provisoire ("TODO", "ambigue") : le label définitif, s'il existe, est sur une ligne suivante
+        if is_unfinished(obj.get("label")):
+            continue
+        if obj.get("confidence") is not None and obj["confidence"] < MIN_LABEL_CONFIDENCE:
+            continue
         # Conversion label en binaire
         label = 1 if obj['label'].lower() == "affirmative." else 0
         # Construire un texte combiné (tu peux ajuster)
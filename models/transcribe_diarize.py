@@ -2,11 +2,23 @@ import os
 import json
 import subprocess
 import torch
-import gc
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from faster_whisper import WhisperModel
-from pyannote.audio import Pipeline
 from huggingface_hub import login
+from model_registry import get_model_registry
+from transcription_backends import create_backend
+from transcript_cache import get_transcript_cache
+from transcript_format import write_transcript
+
+DIARIZATION_MODEL = "pyannote/speaker-diarization-3.1"
+SEGMENT_PRECISION = 1e-6   # pyannote.core : une intersection plus courte est considérée comme vide
+UNKNOWN_SPEAKER = "Unknown"
+# transcription et diarisation lancées en même temps (chacune dans son thread), avec un budget de threads
+# CPU chacune : CTranslate2 (faster-whisper) et torch (pyannote) relâchent le GIL pendant le calcul
+CONCURRENT_STAGES = True
+ASR_CPU_THREADS = max(1, (os.cpu_count() or 2) // 2)
+DIARIZATION_CPU_THREADS = max(1, (os.cpu_count() or 2) - ASR_CPU_THREADS)
 
 def convert_m4a_to_wav(input_path, output_path, sample_rate=16000):
     if not os.path.exists(output_path):
@@ -26,7 +38,96 @@ def convert_m4a_to_wav(input_path, output_path, sample_rate=16000):
     else:
         print(" Le fichier WAV existe déjà, pas de conversion nécessaire.")
 
-def transcribe_and_diarize(audio_path):
+def diarization_turns(diarization):
+    """
+    Tours de parole d'une annotation pyannote : liste de [début, fin, locuteur] (sérialisable).
+    """
+    return [[turn.start, turn.end, speaker] for turn, _, speaker in diarization.itertracks(yield_label=True)]
+
+def assign_speakers(segments, turns):
+    """
+    Locuteur de chaque segment : celui dont le tour de parole recouvre le plus le segment
+    (à égalité, le premier tour dans l'ordre de pyannote ; "Unknown" sans recouvrement).
+    Les tours sont triés une seule fois dans des tableaux NumPy ; pour chaque segment, seuls les tours
+    qui peuvent le recouvrir sont examinés (recherche dichotomique sur les débuts et sur le maximum
+    cumulé des fins), au lieu de parcourir tous les tours.
+
+    - segments : dictionnaires start / end
+    - turns : [début, fin, locuteur], voir diarization_turns
+    Retourne la liste des locuteurs, dans l'ordre des segments.
+    """
+    if not turns:
+        return [UNKNOWN_SPEAKER] * len(segments)
+    # même ordre que itertracks (tri par début puis fin, stable pour les tours identiques)
+    turns = sorted(turns, key=lambda t: (t[0], t[1]))
+    starts = np.array([t[0] for t in turns], dtype=np.float64)
+    ends = np.array([t[1] for t in turns], dtype=np.float64)
+    labels = [t[2] for t in turns]
+    # fins croissantes malgré les tours imbriqués : premier tour pouvant encore finir après le segment
+    max_ends = np.maximum.accumulate(ends)
+
+    speakers = []
+    for seg in segments:
+        seg_start, seg_end = seg["start"], seg["end"]
+        lo = int(np.searchsorted(max_ends, seg_start, side="right"))
+        hi = int(np.searchsorted(starts, seg_end, side="left"))
+        if lo >= hi:
+            speakers.append(UNKNOWN_SPEAKER)
+            continue
+        overlaps = np.minimum(ends[lo:hi], seg_end) - np.maximum(starts[lo:hi], seg_start)
+        overlaps[overlaps <= SEGMENT_PRECISION] = 0
+        best = int(np.argmax(overlaps))
+        speakers.append(labels[lo + best] if overlaps[best] > 0 else UNKNOWN_SPEAKER)
+    return speakers
+
+def run_transcription(wav_path, backend, cache=None):
+    """
+    Transcription faster-whisper d'un WAV (reprise du cache si disponible).
+    Retourne {"segments": [...], "language": ...}.
+    """
+    print(" Transcription...")
+    config = backend.config()
+    result = cache.get(wav_path, config) if cache is not None else None
+    if result is None:
+        result = backend.transcribe(wav_path)
+        if cache is not None:
+            cache.put(wav_path, config, result)
+    else:
+        print(" Transcription reprise du cache.")
+    return result
+
+def run_diarization(wav_path, device, hf_token, cache=None, cpu_threads=0):
+    """
+    Diarisation pyannote d'un WAV (reprise du cache si disponible).
+    Retourne les tours de parole [début, fin, locuteur], voir diarization_turns.
+
+    - cpu_threads : threads torch utilisés sur CPU (0 : valeur par défaut de torch)
+    """
+    print(" Diarisation...")
+    diarization_config = {"diarization": DIARIZATION_MODEL}
+    cached = cache.get(wav_path, diarization_config) if cache is not None else None
+    if cached is not None:
+        print(" Diarisation reprise du cache.")
+        return cached["turns"]
+    if device == "cpu" and cpu_threads:
+        torch.set_num_threads(cpu_threads)
+    with get_model_registry().use("pyannote", DIARIZATION_MODEL, device, use_auth_token=hf_token) as pipeline:
+        diarization = pipeline(wav_path)
+    turns = diarization_turns(diarization)
+    if cache is not None:
+        cache.put(wav_path, diarization_config, {"turns": turns})
+    return turns
+
+def transcribe_and_diarize(audio_path, backend=None, concurrent=CONCURRENT_STAGES,
+                           asr_threads=ASR_CPU_THREADS, diarization_threads=DIARIZATION_CPU_THREADS):
+    """
+    Transcription + diarisation d'un appel, fusionnées dans un fichier _diarized.txt.
+
+    - audio_path : chemin de l'audio (.m4a converti en .wav si nécessaire)
+    - backend : backend de transcription (faster-whisper avec asr_threads threads si absent)
+    - concurrent : transcription et diarisation en parallèle, fusion quand les deux sont terminées
+    - asr_threads, diarization_threads : budgets de threads CPU de chaque étape
+    """
     with open("secrets.json", "r") as f:
         hf_token = json.load(f)["use_auth_token"]
     
@@ -38,63 +139,56 @@ def transcribe_and_diarize(audio_path):
     wav_path = audio_path.replace(".m4a", ".wav")
     convert_m4a_to_wav(audio_path, wav_path)
 
-    # Transcription
-    print(" Transcription...")
-    model = WhisperModel("large-v2", device=device, compute_type="float16")
-    segments, _ = model.transcribe(wav_path, beam_size=5)
+    # faster-whisper : float16 sur GPU, int8 sur CPU ; langue détectée automatiquement
+    backend = backend or create_backend("faster-whisper", device=device, beam_size=5, language=None,
+                                        cpu_threads=asr_threads if device == "cpu" else 0)
+    # transcription et diarisation sont gardées en cache séparément (même audio, même configuration)
+    cache = get_transcript_cache()
+
+    if concurrent:
+        # les deux étapes sont indépendantes jusqu'à la fusion : durée ≈ la plus longue des deux
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            asr_future = executor.submit(run_transcription, wav_path, backend, cache)
+            turns_future = executor.submit(run_diarization, wav_path, device, hf_token, cache, diarization_threads)
+            result, turns = asr_future.result(), turns_future.result()
+    else:
+        result = run_transcription(wav_path, backend, cache)
+        turns = run_diarization(wav_path, device, hf_token, cache, diarization_threads)
+
     segment_list = [{
-        "start": round(seg.start, 2),
-        "end": round(seg.end, 2),
-        "text": seg.text.strip()
-    } for seg in segments]
-    del model
-    torch.cuda.empty_cache()
-    gc.collect()
-
-    # Diarisation
-    print(" Diarisation...")
-    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", use_auth_token=hf_token).to(torch.device(device))
-    diarization = pipeline(wav_path)
+        "start": round(seg["start"], 2),
+        "end": round(seg["end"], 2),
+        "text": seg["text"],
+        "avg_logprob": seg.get("avg_logprob")
+    } for seg in result["segments"]]
 
     # Association speaker + texte
     print(" Fusion...")
     final_lines = []
-    from pyannote.core import Segment
-
-    def get_matching_speaker(seg_start, seg_end, diarization):
-        seg = Segment(seg_start, seg_end)
-        max_overlap = 0
-        matched_speaker = "Unknown"
-
-        for turn, _, speaker in diarization.itertracks(yield_label=True):
-            overlap = seg & turn  # intersection entre les intervalles
-            if overlap and overlap.duration > max_overlap:
-                max_overlap = overlap.duration
-                matched_speaker = speaker
-
-        return matched_speaker
-
-    for seg in segment_list:
+    diarized_segments = []
+    speaker_labels = assign_speakers(segment_list, turns)
+    for seg, speaker_label in zip(segment_list, speaker_labels):
         seg_start = seg["start"]
         seg_end = seg["end"]
         seg_text = seg["text"]
 
-        speaker_label = get_matching_speaker(seg_start, seg_end, diarization)
-
         start_str = str(timedelta(seconds=int(seg_start)))
         end_str = str(timedelta(seconds=int(seg_end)))
         final_lines.append(f"[{start_str} - {end_str}] {speaker_label} : {seg_text}")
+        diarized_segments.append(dict(seg, speaker=speaker_label))
 
 
     # Sauvegarde finale
     output_txt = wav_path.replace(".wav", "_diarized.txt")
     with open(output_txt, "w", encoding="utf-8") as f:
         f.write("\n".join(final_lines))
+    # version structurée (locuteur, confiance, texte en minuscules) lue par score.py
+    write_transcript(output_txt, diarized_segments, language=result.get("language"), source=wav_path)
     print(f" Transcription avec diarisation enregistrée dans : {output_txt}")
 
 if __name__ == "__main__":
     with open("data/last_filename.txt", "r", encoding="utf-8") as f:
         filename = f.read().strip()
 
-transcribe_and_diarize(f"data/raw/{filename}")
+    transcribe_and_diarize(f"data/raw/{filename}")
 
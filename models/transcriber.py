@@ -1,46 +1,69 @@
-import whisper
-import torch
-import gc
 import os
 import threading
+from pedalboard.io import AudioFile
+from transcription_backends import create_backend
+from long_transcription import LongAudioTranscriber, LONG_AUDIO_MIN_SEC
+from transcript_cache import get_transcript_cache
+from transcript_format import write_transcript
 
 PLOT_LOCK = threading.Lock()
 
 class Transcriber:
-    def __init__(self, audio_path, language="fr", verbose=True):
+    def __init__(self, audio_path, language="fr", verbose=True, backend=None, speech_timestamps=None, cache=None):
         self.audio_path = audio_path
         self.language = language
-        self.device = "cuda"
+        # transcription_backends.TranscriptionBackend (None : backend le plus rapide disponible)
+        self.backend = backend or create_backend(language=language)
         self.transcription = ""
+        self.segments = []
+        self.result = None
         self.verbose = verbose
+        # timestamps VAD de l'audio nettoyé (AudioProcessor.cleaned_speech_timestamps), pour les longs enregistrements
+        self.speech_timestamps = speech_timestamps
+        # transcript_cache.TranscriptCache (None : cache partagé du processus, s'il est activé)
+        self.cache = cache or get_transcript_cache()
 
     def transcribe(self):
+        with AudioFile(self.audio_path) as f:
+            duration = f.frames / f.samplerate
+        # au-delà de LONG_AUDIO_MIN_SEC, morceaux coupés au VAD et transcrits en parallèle ;
+        # le découpage fait partie de la clé de cache (résultat différent d'une transcription d'un seul tenant)
+        long_transcriber = LongAudioTranscriber(self.backend) if duration >= LONG_AUDIO_MIN_SEC else None
+        config = self.backend.config()
+        if long_transcriber is not None:
+            config["chunking"] = long_transcriber.config()
 
-        # chargement du modèle whisperX
-        model = whisper.load_model("large-v2", self.device)
-
+        if self.cache is not None:
+            result = self.cache.get(self.audio_path, config)
+            if result is not None:
+                if self.verbose:
+                    print(f"Transcription de {self.audio_path} reprise du cache.")
+                self.set_result(result)
+                return
         try:
             if self.verbose:
-                print(f"Transcription de {self.audio_path} en cours...")
-        # transcription de l'audio
-            result = model.transcribe(self.audio_path, language=self.language, verbose=self.verbose)
-
-            self.segments = result.get("segments", [])
-
-            self.transcription = " ".join([seg["text"].strip() for seg in self.segments])
+                print(f"Transcription de {self.audio_path} en cours ({self.backend})...")
+            # transcription de l'audio (modèle partagé via le registre)
+            if long_transcriber is not None:
+                self.set_result(long_transcriber.transcribe_file(self.audio_path, self.speech_timestamps))
+            else:
+                self.set_result(self.backend.transcribe(self.audio_path))
+            if self.cache is not None:
+                self.cache.put(self.audio_path, config, self.result)
             if self.verbose:
                 print(f"Transcription de {self.audio_path} terminée.")
         except Exception as e:
             print(f"Erreur lors de la transcription : {e}")
             raise
-
-        finally:
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.synchronize()
-            del model
         
+    def set_result(self, result):
+        """
+        Enregistre un résultat de backend ({"segments": [...]}), par exemple issu d'une transcription par lots.
+        """
+        self.result = result
+        self.segments = result["segments"]
+        self.transcription = " ".join([seg["text"].strip() for seg in self.segments])
+
     def save_transcript(self):
         if not self.segments:
             print("Aucune transcription à sauvegarder.")
@@ -56,6 +79,9 @@ class Transcriber:
                         start = self.format_time(seg["start"])
                         end = self.format_time(seg["end"])
                         f.write(f"[{start} - {end}] : {seg['text'].strip()}\n")
+                # version structurée (timings, confiance, mots) lue par les étapes suivantes
+                write_transcript(output_path, self.segments, language=(self.result or {}).get("language"),
+                                 source=self.audio_path)
 
                 print(f"Transcription sauvegardée : {output_path}")
             except Exception as e:
@@ -0,0 +1,67 @@
+import json
+import threading
+from content_cache import ContentCache, file_sha256, config_fingerprint
+
+TRANSCRIPT_CACHE_DIR = "data/cache/transcripts"
+TRANSCRIPT_CACHE_MAX_BYTES = 1024 ** 3
+TRANSCRIPT_CACHE_ENABLED = True
+TRANSCRIPT_CACHE_VERSION = 1
+
+def _to_builtin(value):
+    # scalaires NumPy / torch (timestamps, scores d'alignement) -> types Python
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class TranscriptCache:
+    """
+    Cache persistant des transcriptions, indexé par l'empreinte du contenu audio et par la configuration
+    de décodage (backend, modèle, langue, beam size, type de calcul, étape). Une entrée garde le résultat
+    complet : segments, mots horodatés, avg_logprob et locuteurs s'ils existent.
+    Modifier la logique aval (mots-clés, score) ne coûte donc plus aucun décodage.
+
+    - cache_dir : dossier du cache
+    - max_bytes : taille maximale (LRU au-delà)
+    """
+    def __init__(self, cache_dir=TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_MAX_BYTES):
+        self.cache = ContentCache(cache_dir, max_bytes)
+
+    def key(self, audio_path, config):
+        config = dict(config, cache_version=TRANSCRIPT_CACHE_VERSION)
+        return self.cache.make_key(file_sha256(audio_path), config_fingerprint(config))
+
+    def get(self, audio_path, config):
+        """
+        Résultat en cache ({"segments": [...], ...}) pour cet audio et cette configuration, ou None.
+        """
+        entry = self.cache.get(self.key(audio_path, config))
+        if entry is None:
+            return None
+        try:
+            return self.cache.load_meta(entry)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, audio_path, config, result):
+        result = json.loads(json.dumps(result, default=_to_builtin))
+        self.cache.put(self.key(audio_path, config), result)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_transcript_cache():
+    """
+    Cache de transcriptions partagé par le processus (None si TRANSCRIPT_CACHE_ENABLED est faux).
+    """
+    global _CACHE
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TranscriptCache()
+        return _CACHE
@@ -0,0 +1,183 @@
+import os
+import json
+import shutil
+import uuid
+import numpy as np
+
+TRANSCRIPT_EXT = ".transcript"
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+UNKNOWN_SPEAKER = -1
+
+# Format structuré d'une transcription : un dossier <nom>.transcript/ avec une colonne par fichier.
+#  - colonnes numériques (.npy, lues en mémoire partagée avec mmap) :
+#    start, end (float64, secondes), speaker (int16, indice dans meta["speakers"], -1 si inconnu),
+#    confidence (float32, avg_logprob, NaN si inconnu),
+#    word_segment (int32), word_start, word_end (float64), word_score (float32)
+#  - colonnes de texte : <nom>.bin (UTF-8 concaténé) + <nom>.offsets.npy (int64, n + 1 bornes)
+#    text, text_lower (texte déjà normalisé en minuscules), word
+SEGMENT_COLUMNS = ("start", "end", "speaker", "confidence")
+WORD_COLUMNS = ("word_segment", "word_start", "word_end", "word_score")
+TEXT_COLUMNS = ("text", "text_lower", "word")
+
+def transcript_path(path):
+    """
+    Chemin du transcript structuré associé à un fichier (audio, .txt ou déjà .transcript).
+    """
+    base, ext = os.path.splitext(path)
+    return path if ext == TRANSCRIPT_EXT else base + TRANSCRIPT_EXT
+
+def format_time(seconds):
+    minutes = int(seconds // 60)
+    sec = int(seconds % 60)
+    return f"{minutes:02d}:{sec:02d}"
+
+def format_timecode(start, end):
+    """
+    Timecode des transcriptions texte : "[mm:ss - mm:ss]".
+    """
+    return f"[{format_time(start)} - {format_time(end)}]"
+
+def _save_text_column(directory, name, values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+def _optional_float(value):
+    return np.nan if value is None else value
+
+def write_transcript(path, segments, language=None, source=None):
+    """
+    Écrit un transcript structuré (écriture dans un dossier temporaire puis renommage).
+
+    - path : chemin du transcript (ou d'un fichier associé, voir transcript_path)
+    - segments : dictionnaires start / end / text, et si disponibles speaker, avg_logprob,
+      words (dictionnaires word / start / end / score) ; les segments au texte vide ne sont pas écrits
+    - language, source : informations gardées dans meta.json
+    Retourne le chemin du transcript.
+    """
+    path = transcript_path(path)
+    # segments sans texte écartés, comme à la relecture des transcriptions texte ("[mm:ss - mm:ss] :" sans texte)
+    segments = [seg for seg in segments if seg["text"].strip()]
+    tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp_path)
+    try:
+        speakers = sorted({seg["speaker"] for seg in segments if seg.get("speaker") is not None})
+        speaker_index = {speaker: i for i, speaker in enumerate(speakers)}
+        texts = [seg["text"].strip() for seg in segments]
+
+        columns = {
+            "start": np.array([seg["start"] for seg in segments], dtype=np.float64),
+            "end": np.array([seg["end"] for seg in segments], dtype=np.float64),
+            "speaker": np.array([speaker_index.get(seg.get("speaker"), UNKNOWN_SPEAKER) for seg in segments],
+                                dtype=np.int16),
+            "confidence": np.array([_optional_float(seg.get("avg_logprob")) for seg in segments], dtype=np.float32),
+        }
+        words = [(i, w) for i, seg in enumerate(segments) for w in (seg.get("words") or [])]
+        columns["word_segment"] = np.array([i for i, _ in words], dtype=np.int32)
+        columns["word_start"] = np.array([_optional_float(w.get("start")) for _, w in words], dtype=np.float64)
+        columns["word_end"] = np.array([_optional_float(w.get("end")) for _, w in words], dtype=np.float64)
+        columns["word_score"] = np.array([_optional_float(w.get("score", w.get("probability"))) for _, w in words],
+                                         dtype=np.float32)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+
+        _save_text_column(tmp_path, "text", texts)
+        _save_text_column(tmp_path, "text_lower", [t.lower() for t in texts])
+        _save_text_column(tmp_path, "word", [w.get("word", "").strip() for _, w in words])
+
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "n_segments": len(segments),
+                "n_words": len(words),
+                "speakers": speakers,
+                "language": language,
+                "source": source,
+            }, f, ensure_ascii=False)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+class TranscriptReader:
+    """
+    Lecture d'un transcript structuré. Chaque colonne n'est lue qu'à la demande, en mémoire partagée (mmap) :
+    une étape qui n'a besoin que de text_lower ne charge ni les timings ni les mots.
+
+    - path : chemin du transcript (ou d'un fichier associé, voir transcript_path)
+    """
+    def __init__(self, path):
+        self.path = transcript_path(path)
+        with open(os.path.join(self.path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Version de transcript non supportée : {self.meta.get('version')} ({self.path})")
+        self.speakers = self.meta["speakers"]
+        self._columns = {}
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(transcript_path(path), META_FILE))
+
+    def __len__(self):
+        return self.meta["n_segments"]
+
+    def column(self, name):
+        """
+        Colonne numérique (start, end, speaker, confidence, word_*), en lecture seule.
+        """
+        if name not in self._columns:
+            if name not in SEGMENT_COLUMNS + WORD_COLUMNS:
+                raise KeyError(f"Colonne inconnue : {name}")
+            self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def _text_blob(self, name):
+        key = f"{name}.bin"
+        if key not in self._columns:
+            if name not in TEXT_COLUMNS:
+                raise KeyError(f"Colonne de texte inconnue : {name}")
+            blob_path = os.path.join(self.path, key)
+            size = os.path.getsize(blob_path)
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if size else np.zeros(0, dtype=np.uint8)
+            offsets = np.load(os.path.join(self.path, f"{name}.offsets.npy"), mmap_mode="r")
+            self._columns[key] = (blob, offsets)
+        return self._columns[key]
+
+    def text(self, i, name="text"):
+        blob, offsets = self._text_blob(name)
+        return bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def texts(self, name="text"):
+        """
+        Toutes les valeurs d'une colonne de texte (text, text_lower ou word).
+        """
+        blob, offsets = self._text_blob(name)
+        data = bytes(blob)
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def speaker_labels(self):
+        return [self.speakers[k] if k >= 0 else None for k in self.column("speaker")]
+
+    def timecodes(self):
+        return [format_timecode(start, end) for start, end in zip(self.column("start"), self.column("end"))]
+
+    def words(self, i):
+        """
+        Mots du segment i : liste de dictionnaires word / start / end / score.
+        """
+        seg = self.column("word_segment")
+        lo, hi = np.searchsorted(seg, i, side="left"), np.searchsorted(seg, i, side="right")
+        starts, ends, scores = self.column("word_start"), self.column("word_end"), self.column("word_score")
+        return [
+            {"word": self.text(k, "word"), "start": float(starts[k]), "end": float(ends[k]), "score": float(scores[k])}
+            for k in range(lo, hi)
+        ]
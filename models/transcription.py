@@ -1,52 +1,98 @@
 import whisperx
-import gc
 import os
-import torch
-
-def transcription(audio_file):
+from transcription_backends import create_backend
+from transcript_cache import get_transcript_cache
+from transcript_format import write_transcript
+from keyword_matcher import KeywordMatcher
+from confidence_gate import ConfidenceGate, gated_transcribe
+
+# "keywords" : seuls les segments contenant un mot-clé SCA / non SCA sont alignés,
+# "all" : alignement de tous les segments, "off" : pas d'alignement
+ALIGN_MODE = "keywords"
+ALIGN_MODES = ("keywords", "all", "off")
+
+def align_segments(segments, audio, language, backend, matcher=None, mode=ALIGN_MODE):
+    """
+    Alignement mot à mot (whisperx), à la demande : selon le mode, aucun segment, tous, ou seulement
+    ceux que le KeywordMatcher signale. Les autres segments sont gardés tels quels (sans "words").
+    Le modèle d'alignement reste en mémoire entre les appels (registre de modèles).
+    """
+    if mode not in ALIGN_MODES:
+        raise ValueError(f"Mode d'alignement inconnu : {mode} (attendu : {', '.join(ALIGN_MODES)})")
+    if mode == "off" or not segments:
+        return list(segments)
+    flagged = range(len(segments)) if mode == "all" else (matcher or KeywordMatcher()).flag_segments(segments)
+    if not flagged:
+        return list(segments)
+
+    with backend.registry.use("whisperx-align", language, backend.device) as (model_a, metadata):
+        aligned = whisperx.align([segments[i] for i in flagged], model_a, metadata, audio, backend.device,
+                                 return_char_alignments=False)
+    flagged = set(flagged)
+    merged = [seg for i, seg in enumerate(segments) if i not in flagged] + aligned["segments"]
+    merged.sort(key=lambda seg: seg["start"])
+    return merged
+
+def transcription(audio_file, backend=None, align_mode=ALIGN_MODE, matcher=None, gate=None):
     """
     Cette fonction permet la transcription d'un fichier audio en fichier .txt.
     Elle permet d'afficher la transcription et de la sauvegarder en .txt.
 
     -audio_file: chemin vers l'audio à trancrire
+    -backend: backend de transcription (transcription_backends), faster-whisper si absent : ses segments sont
+     décodés à la demande, ce qui permet d'arrêter le décodage d'un audio inexploitable
+    -align_mode: segments à aligner, voir ALIGN_MODES
+    -matcher: KeywordMatcher utilisé par le mode "keywords"
+    -gate: confidence_gate.ConfidenceGate, décision de rejet sur les premières secondes décodées
     """
-    # on détermine les constantes importantes
-    device = "cuda"
-    batch_size = 4
-    compute_type = "float16"
-    language = "fr"
-
-    # chargement du modèle whisperX
-    model = whisperx.load_model("large-v2", device, compute_type=compute_type, language=language)
-
-    # transcription de l'audio
-    audio = whisperx.load_audio(audio_file)
-    result = model.transcribe(audio, batch_size=batch_size)
-    segments = result["segments"]
-    # print(segments)
-
-    # on supprime le modèle
-    gc.collect()
-    torch.cuda.empty_cache()
-    del model
-
-    # alignement des segments
-    model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
-    result = whisperx.align(segments, model_a, metadata, audio, device, return_char_alignments=False)
+    # float16 sur GPU, int8 sur CPU ; l'alignement reste fait par whisperx
+    backend = backend or create_backend("faster-whisper", language="fr")
+    gate = gate or ConfidenceGate()
+
+    # résultat aligné déjà calculé pour cet audio et cette configuration : aucun décodage
+    cache = get_transcript_cache()
+    config = dict(backend.config(), align_mode=align_mode, gate=gate.config())
+    if align_mode == "keywords":
+        matcher = matcher or KeywordMatcher()
+        config["keywords"] = matcher.fingerprint()
+    result = cache.get(audio_file, config) if cache is not None else None
+
+    if result is None:
+        # transcription de l'audio (modèle chargé une seule fois par processus), arrêtée dès que
+        # les premières secondes sont jugées inexploitables
+        audio = whisperx.load_audio(audio_file)
+        asr = gated_transcribe(backend, audio, gate)
+        # print(segments)
+
+        # alignement des segments utiles seulement (modèle d'alignement gardé en mémoire par langue),
+        # inutile pour un audio rejeté
+        segments = asr["segments"]
+        if not asr["rejected"]:
+            segments = align_segments(segments, audio, asr["language"], backend, matcher, align_mode)
+
+        # l'alignement ne conserve pas avg_logprob : on le lit sur les segments de la transcription
+        result = {
+            "segments": segments,
+            "avg_logprobs": [seg["avg_logprob"] for seg in asr["segments"] if seg.get("avg_logprob") is not None],
+            "language": asr["language"],
+            "early_reject": asr["reject_reason"],
+            "decoded_sec": asr["decoded_sec"],
+            "skipped_sec": asr["skipped_sec"],
+        }
+        if cache is not None:
+            cache.put(audio_file, config, result)
 
     segments = result["segments"]
     # print(segments)
 
-    # on supprime le modèle
-    gc.collect()
-    torch.cuda.empty_cache()
-    del model_a
-
     transcription_text = " ".join([seg["text"].strip() for seg in segments])
-    avg_logprobs = [seg["avg_logprob"] for seg in segments if "avg_logprob" in seg]
+    avg_logprobs = result["avg_logprobs"]
     global_conf = sum(avg_logprobs) / len(avg_logprobs) if avg_logprobs else -999
     rejeter = False
+    early_reject = result.get("early_reject")
 
+    if early_reject:
+        rejeter = True
     if len(transcription_text.strip()) < 10:
         rejeter = True
     if global_conf < -1.2:
@@ -59,6 +105,12 @@ def transcription(audio_file):
 
     if not rejeter:
         save_to_txt(audio_file, segments)
+    elif early_reject:
+        print(f"→ Décodage arrêté après {result['decoded_sec']:.0f}s : {early_reject} "
+              f"({result['skipped_sec']:.0f}s non décodées)")
+        with open("data/transcript/rejected_transcriptions.txt", "a") as f:
+            f.write(f"REJECTED: {audio_file} | arrêt anticipé : {early_reject} | "
+                    f"décodé : {result['decoded_sec']:.1f}s | ignoré : {result['skipped_sec']:.1f}s\n")
     else:
         with open("data/transcript/rejected_transcriptions.txt", "a") as f:
             f.write(f"REJECTED: {audio_file}\n")
@@ -83,14 +135,18 @@ def save_to_txt(audio_file, segments):
             end = format_time(segment["end"])
             text = segment["text"].strip()
             f.write(f"[{start} - {end}] : {text}\n")
+    # version structurée, avec les timings des mots issus de l'alignement
+    write_transcript(output_txt, segments, language="fr", source=audio_file)
 
     print(f"Transcription sauvegardée : {output_txt}")
 
 # script principal
 if __name__ == "__main__":
     audio_dir = "data/audio/hospital"
+    backend = create_backend("faster-whisper", language="fr")
+    matcher = KeywordMatcher()
     for file_name in os.listdir(audio_dir):
         if file_name.lower().endswith("_cleaned.wav"):
             audio_path = os.path.join(audio_dir, file_name)
             print(f"\nTranscription de : {audio_path}")
-            transcription(audio_path) 
\ No newline at end of file
+            transcription(audio_path, backend=backend, matcher=matcher)
\ No newline at end of file
@@ -0,0 +1,306 @@
+import os
+import importlib.util
+import numpy as np
+from model_registry import get_model_registry
+
+DEFAULT_MODEL = "large-v2"
+DEFAULT_LANGUAGE = "fr"
+DEFAULT_BEAM_SIZE = 5
+ASR_SAMPLING_RATE = 16000
+WHISPERX_BATCH_SIZE = 4
+# "auto" : backend le plus rapide parmi ceux installés (voir auto_backend)
+TRANSCRIPTION_BACKEND = "auto"
+COMPUTE_TYPES = ("int8", "int8_float32", "int8_float16", "float16", "float32")
+
+# modules Python requis par chaque backend
+BACKEND_MODULES = {
+    "faster-whisper": "faster_whisper",
+    "whisperx": "whisperx",
+    "whisper": "whisper",
+}
+# ordre de préférence : whisperx (inférence par lots) sur GPU, CTranslate2 int8 sur CPU
+GPU_PREFERENCE = ("whisperx", "faster-whisper", "whisper")
+CPU_PREFERENCE = ("faster-whisper", "whisperx", "whisper")
+
+def detect_device():
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+def default_compute_type(backend, device):
+    """
+    Type de calcul par défaut : float16 sur GPU, int8 sur CPU (float32 pour openai-whisper).
+    """
+    if device == "cuda":
+        return "float16"
+    return "float32" if backend == "whisper" else "int8"
+
+def available_backends():
+    return [name for name, module in BACKEND_MODULES.items() if importlib.util.find_spec(module) is not None]
+
+def auto_backend(device=None):
+    """
+    Choisit le backend le plus rapide parmi ceux installés pour ce device.
+    """
+    device = device or detect_device()
+    installed = available_backends()
+    for name in (GPU_PREFERENCE if device == "cuda" else CPU_PREFERENCE):
+        if name in installed:
+            return name
+    raise RuntimeError(f"Aucun backend de transcription installé (attendu : {', '.join(BACKEND_MODULES)})")
+
+def _segment(start, end, text, avg_logprob=None, no_speech_prob=None):
+    return {
+        "start": float(start),
+        "end": float(end),
+        "text": text,
+        "avg_logprob": avg_logprob,
+        "no_speech_prob": no_speech_prob,
+    }
+
+
+class TranscriptionBackend:
+    """
+    Interface commune des moteurs de transcription. transcribe() accepte un chemin de fichier
+    ou un signal mono float32 à 16 kHz et retourne {"segments": [...], "language": ...},
+    chaque segment étant un dictionnaire start / end / text / avg_logprob / no_speech_prob.
+
+    - model_name : taille du modèle Whisper (tiny ... large-v2)
+    - device : "cuda" ou "cpu" (détecté si absent)
+    - compute_type : int8, int8_float32, float16, float32 (selon le device si absent)
+    - beam_size : largeur du beam search
+    - cpu_threads : nombre de threads CPU du moteur (0 : valeur par défaut du moteur)
+    - language : langue de l'audio
+    - num_workers : appels concurrents possibles sur le même modèle (faster-whisper, sinon ignoré)
+    """
+    name = None
+    batched = False  # inférence par lots dans transcribe_chunks (sinon morceaux traités un par un)
+    concurrent = False  # plusieurs transcribe() en parallèle sur le même modèle (voir concurrency)
+
+    def __init__(self, model_name=DEFAULT_MODEL, device=None, compute_type=None, beam_size=DEFAULT_BEAM_SIZE,
+                 cpu_threads=0, language=DEFAULT_LANGUAGE, registry=None, num_workers=1):
+        self.model_name = model_name
+        self.device = device or detect_device()
+        self.compute_type = compute_type or default_compute_type(self.name, self.device)
+        if self.compute_type not in COMPUTE_TYPES:
+            raise ValueError(f"Type de calcul inconnu : {self.compute_type} (attendu : {', '.join(COMPUTE_TYPES)})")
+        self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.num_workers = num_workers
+        self.registry = registry or get_model_registry()
+
+    def config(self):
+        """
+        Paramètres qui influencent le résultat (pour les clés de cache et les journaux).
+        """
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "language": self.language,
+            "beam_size": self.beam_size,
+            "compute_type": self.compute_type,
+        }
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    @property
+    def concurrency(self):
+        """
+        Nombre de transcribe() réellement exécutés en même temps sur le modèle (les autres attendent leur tour).
+        """
+        return max(self.num_workers, 1) if self.concurrent else 1
+
+    def iter_segments(self, audio):
+        """
+        Segments au fil du décodage : retourne (itérateur de segments, langue), l'itérateur est à fermer (close).
+        Par défaut tout est décodé avant le premier segment ; faster-whisper décode à la demande,
+        cesser d'itérer arrête alors le décodage.
+        """
+        result = self.transcribe(audio)
+        return iter(result["segments"]), result["language"]
+
+    def transcribe_chunks(self, chunks, batch_size=1):
+        """
+        Transcrit une liste de morceaux (signaux à 16 kHz d'au plus 30 s, éventuellement issus de fichiers
+        différents). Timestamps relatifs au début de chaque morceau ; un résultat par morceau.
+        Par défaut les morceaux sont traités un par un, les backends capables d'inférence par lots surchargent.
+        """
+        return [self.transcribe(chunk) for chunk in chunks]
+
+    def __repr__(self):
+        return f"{self.name}({self.model_name}, {self.device}, {self.compute_type}, beam={self.beam_size})"
+
+
+class WhisperBackend(TranscriptionBackend):
+    """
+    openai-whisper (PyTorch). int8 : quantification dynamique, sur CPU uniquement.
+    """
+    name = "whisper"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.compute_type == "int8" and self.device != "cpu":
+            raise ValueError("openai-whisper : int8 n'est disponible que sur CPU")
+        if self.compute_type not in ("int8", "float16", "float32"):
+            raise ValueError(f"openai-whisper ne supporte pas {self.compute_type}")
+
+    def transcribe(self, audio, verbose=False):
+        # cpu_threads est appliqué au chargement du modèle (voir model_registry._load_whisper)
+        options = {"cpu_threads": self.cpu_threads} if self.device == "cpu" and self.cpu_threads else {}
+        with self.registry.use("whisper", self.model_name, self.device, self.compute_type, **options) as model:
+            result = model.transcribe(audio, language=self.language, beam_size=self.beam_size,
+                                      fp16=self.compute_type == "float16", verbose=verbose)
+        segments = [
+            _segment(seg["start"], seg["end"], seg["text"].strip(), seg.get("avg_logprob"), seg.get("no_speech_prob"))
+            for seg in result.get("segments", [])
+        ]
+        return {"segments": segments, "language": result.get("language", self.language)}
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """
+    faster-whisper (CTranslate2), le plus rapide sur CPU en int8.
+    """
+    name = "faster-whisper"
+    batched = True
+    concurrent = True
+
+    def model_options(self):
+        options = {"cpu_threads": self.cpu_threads} if self.cpu_threads else {}
+        if self.num_workers > 1:
+            # CTranslate2 : plusieurs transcriptions en parallèle sur le même modèle (cpu_threads par worker)
+            options["num_workers"] = self.num_workers
+        return options
+
+    def model(self):
+        return self.registry.use("faster-whisper", self.model_name, self.device, self.compute_type, **self.model_options())
+
+    def transcribe(self, audio, verbose=False):
+        with self.model() as model:
+            segments, info = model.transcribe(audio, language=self.language, beam_size=self.beam_size)
+            segments = [
+                _segment(seg.start, seg.end, seg.text.strip(), seg.avg_logprob, seg.no_speech_prob)
+                for seg in segments
+            ]
+        return {"segments": segments, "language": info.language}
+
+    def iter_segments(self, audio):
+        # le modèle reste réservé (registre) tant que le générateur n'est pas fermé ou épuisé
+        segments = self._iter_segments(audio)
+        return segments, next(segments)
+
+    def _iter_segments(self, audio):
+        # générateur paresseux de faster-whisper : chaque segment n'est décodé que lorsqu'il est demandé ;
+        # la langue est produite en premier
+        with self.model() as model:
+            segments, info = model.transcribe(audio, language=self.language, beam_size=self.beam_size)
+            yield info.language
+            for seg in segments:
+                yield _segment(seg.start, seg.end, seg.text.strip(), seg.avg_logprob, seg.no_speech_prob)
+
+    def transcribe_chunks(self, chunks, batch_size=8):
+        """
+        Inférence par lots (BatchedInferencePipeline) : les morceaux sont mis bout à bout et délimités par
+        clip_timestamps, chacun est décodé indépendamment, puis chaque segment est rendu à son morceau.
+        """
+        from faster_whisper import BatchedInferencePipeline
+
+        bounds = np.cumsum([0] + [len(chunk) for chunk in chunks])
+        clips = [{"start": int(start), "end": int(end)} for start, end in zip(bounds[:-1], bounds[1:])]
+        starts_sec = bounds[:-1] / ASR_SAMPLING_RATE
+        with self.model() as model:
+            segments, info = BatchedInferencePipeline(model=model).transcribe(
+                np.concatenate(chunks).astype(np.float32, copy=False), language=self.language,
+                beam_size=self.beam_size, batch_size=batch_size, vad_filter=False, clip_timestamps=clips
+            )
+            segments = list(segments)
+
+        outputs = [{"segments": [], "language": info.language} for _ in chunks]
+        for seg in segments:
+            k = int(np.searchsorted(starts_sec, (seg.start + seg.end) / 2, side="right")) - 1
+            offset = starts_sec[k]
+            outputs[k]["segments"].append(
+                _segment(max(seg.start - offset, 0), seg.end - offset, seg.text.strip(), seg.avg_logprob, seg.no_speech_prob)
+            )
+        return outputs
+
+
+class WhisperXBackend(TranscriptionBackend):
+    """
+    whisperx (faster-whisper + VAD, inférence par lots de segments), le plus rapide sur GPU.
+    """
+    name = "whisperx"
+    batched = True
+
+    def __init__(self, *args, batch_size=WHISPERX_BATCH_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+
+    def model(self):
+        options = {"asr_options": {"beam_size": self.beam_size}, "language": self.language}
+        if self.cpu_threads:
+            options["threads"] = self.cpu_threads
+        return self.registry.use("whisperx", self.model_name, self.device, self.compute_type, **options)
+
+    def transcribe(self, audio, verbose=False):
+        if isinstance(audio, str):
+            import whisperx
+            audio = whisperx.load_audio(audio)
+        with self.model() as model:
+            result = model.transcribe(audio, batch_size=self.batch_size, language=self.language)
+        segments = [
+            _segment(seg["start"], seg["end"], seg["text"].strip(), seg.get("avg_logprob"))
+            for seg in result["segments"]
+        ]
+        return {"segments": segments, "language": result.get("language", self.language)}
+
+    def transcribe_chunks(self, chunks, batch_size=None):
+        """
+        Inférence par lots avec le pipeline whisperx : chaque morceau (au plus 30 s, déjà coupé au VAD)
+        est une entrée du lot, comme un segment VAD dans whisperx transcribe ; un segment par morceau.
+        Sans langue fixée (tokenizer créé à la détection), les morceaux sont transcrits un par un.
+        """
+        batch_size = batch_size or self.batch_size
+        outputs = None
+        with self.model() as model:
+            if model.tokenizer is not None:
+                outputs = [
+                    out["text"].strip()
+                    for out in model(({"inputs": chunk} for chunk in chunks), batch_size=batch_size, num_workers=0)
+                ]
+                language = model.tokenizer.language_code
+        if outputs is None:
+            return super().transcribe_chunks(chunks)
+        return [
+            {"segments": [_segment(0.0, len(chunk) / ASR_SAMPLING_RATE, text)] if text else [], "language": language}
+            for chunk, text in zip(chunks, outputs)
+        ]
+
+
+BACKENDS = {
+    "whisper": WhisperBackend,
+    "faster-whisper": FasterWhisperBackend,
+    "whisperx": WhisperXBackend,
+}
+
+def create_backend(name=TRANSCRIPTION_BACKEND, workers=1, **options):
+    """
+    Crée un backend de transcription ("auto" : le plus rapide disponible pour le device).
+
+    - name : "auto", "faster-whisper", "whisperx" ou "whisper"
+    - workers : transcriptions simultanées prévues ; un backend réentrant (faster-whisper) charge alors son modèle
+      une seule fois avec num_workers=workers et cœurs / workers threads par worker
+    - options : paramètres de TranscriptionBackend (model_name, device, compute_type, beam_size, cpu_threads, language)
+    """
+    if name == "auto":
+        name = auto_backend(options.get("device"))
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de transcription inconnu : {name} (attendu : auto, {', '.join(BACKENDS)})")
+    if workers > 1 and BACKENDS[name].concurrent:
+        options.setdefault("num_workers", workers)
+        options.setdefault("cpu_threads", max((os.cpu_count() or 1) // workers, 1))
+    return BACKENDS[name](**options)
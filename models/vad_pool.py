@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from silero_vad import load_silero_vad, get_speech_timestamps
+
+VAD_POOL_SIZE = 4
+USE_ONNX = False  # True : sessions onnxruntime au lieu du modèle TorchScript
+
+class VADModelPool:
+    """
+    Pool de taille fixe de modèles Silero VAD, partagé par tout le processus.
+    Un thread emprunte un modèle le temps d'un appel puis le rend : les modèles sont
+    chargés à la demande (au plus `size`) et réutilisés ensuite, quel que soit le nombre de fichiers.
+    Le modèle Silero garde un état interne, il n'est donc jamais utilisé par deux threads à la fois.
+
+    - size : nombre maximum de modèles (ou sessions ONNX) chargés
+    - onnx : charge la version ONNX du modèle
+    """
+    def __init__(self, size=VAD_POOL_SIZE, onnx=USE_ONNX):
+        self.size = size
+        self.onnx = onnx
+        self._models = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._n_loaded = 0
+
+        # temps de chargement et d'inférence (secondes)
+        self.load_time = 0.0
+        self.calls = 0
+        self.call_time = 0.0
+
+    def _load_model(self):
+        start = time.perf_counter()
+        model = load_silero_vad(onnx=self.onnx)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.load_time += elapsed
+        return model
+
+    @contextmanager
+    def acquire(self):
+        """
+        Emprunte un modèle du pool (bloque si les `size` modèles sont déjà utilisés).
+        """
+        try:
+            model = self._models.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_load = self._n_loaded < self.size
+                if can_load:
+                    self._n_loaded += 1
+
+            if can_load:
+                try:
+                    model = self._load_model()
+                except Exception:
+                    with self._lock:
+                        self._n_loaded -= 1
+                    raise
+            else:
+                model = self._models.get()
+
+        try:
+            yield model
+        finally:
+            self._models.put(model)
+
+    def get_speech_timestamps(self, wav, **kwargs):
+        """
+        Équivalent de silero_vad.get_speech_timestamps avec un modèle emprunté au pool.
+
+        - wav : tensor float32 mono
+        - kwargs : paramètres transmis à get_speech_timestamps (sampling_rate, threshold...)
+        """
+        with self.acquire() as model:
+            start = time.perf_counter()
+            timestamps = get_speech_timestamps(wav, model, **kwargs)
+            elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.calls += 1
+            self.call_time += elapsed
+        return timestamps
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models_loaded": self._n_loaded,
+                "load_time": round(self.load_time, 3),
+                "calls": self.calls,
+                "call_time": round(self.call_time, 3),
+                "mean_call_time": round(self.call_time / self.calls, 4) if self.calls else 0,
+            }
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def get_vad_pool(size=None):
+    """
+    Renvoie le pool VAD du processus (créé au premier appel).
+
+    - size : taille du pool ; si elle est plus grande que la taille actuelle, le pool est agrandi
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = VADModelPool(size or VAD_POOL_SIZE)
+        elif size and size > _POOL.size:
+            with _POOL._lock:
+                _POOL.size = size
+        return _POOL
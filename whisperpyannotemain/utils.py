@@ -1,3 +1,4 @@
+import numpy as np
 import pyannote
 
 
@@ -16,6 +17,20 @@ def get_words_timestamps(result_transcription: dict) -> dict:
     return words
 
 
+def get_words_arrays(result_transcription: dict) -> dict:
+    """Get all words their start and end times into NumPy arrays, in transcription order
+
+    Returns:
+        dict: "text" (object array of words), "start" and "end" (float64 arrays)
+    """
+    words = [word for segment in result_transcription["segments"] for word in segment["words"]]
+    return {
+        "text": np.array([word["word"] for word in words], dtype=object),
+        "start": np.array([word["start"] for word in words], dtype=np.float64),
+        "end": np.array([word["end"] for word in words], dtype=np.float64),
+    }
+
+
 def words_per_segment(
     res_transcription: dict,
     res_diarization: pyannote.core.Annotation,
@@ -47,7 +62,11 @@ def words_per_segment(
     res_trans_dia = {}
     segments = list(res_diarization.itersegments())
 
-    words = get_words_timestamps(res_transcription)
+    words = get_words_arrays(res_transcription)
+    starts, ends, texts = words["start"], words["end"], words["text"]
+    # Running maximum of the start times: non-decreasing even if whisper returns a word out of order,
+    # so each turn's word range is found with two binary searches instead of a scan from the first word
+    max_starts = np.maximum.accumulate(starts) if len(starts) else starts
 
     for idx, (segment, _, speaker) in enumerate(
         res_diarization.itertracks(yield_label=True)
@@ -59,12 +78,12 @@ def words_per_segment(
             segment.end + buffer_time if idx != len(segments) - 1 else segment.end
         )
 
-        segment_words = []
-        for _, word in words.items():
-            if word["start"] >= adjusted_start and word["end"] <= adjusted_end:
-                segment_words.append(word["text"])
-            if word["start"] >= adjusted_end:
-                break
+        # Words before `lo` all start before the segment; the scan stops at the first word
+        # starting at or after the segment end (included in the range, as it may still match)
+        lo = np.searchsorted(max_starts, adjusted_start, side="left")
+        hi = np.searchsorted(max_starts, adjusted_end, side="left") + 1
+        inside = (starts[lo:hi] >= adjusted_start) & (ends[lo:hi] <= adjusted_end)
+        segment_words = list(texts[lo:hi][inside])
 
         res_trans_dia[f"segment_{idx}"] = {
             "speaker": speaker,